@@ -0,0 +1,70 @@
+"""Compara tempo e memória de parsing por backend, com e sem parsing parcial.
+
+Uso: python -m benchmarks.bench_parser [--dir benchmarks/snapshots] [--repeat 20]
+
+Os snapshots são o HTML bruto de cada página usada pelos scrapers, salvos com o
+nome gerado por benchmarks.snapshots.snapshot_name.
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.snapshots import SNAPSHOT_DIR, load_snapshots, snapshot_name
+from scrape.base import ScrapeBase
+
+PARSERS = ("html.parser", "lxml")
+
+
+class ParserBench(ScrapeBase):
+    CACHE_DIR = None
+
+
+def measure(scraper, content, identifiers, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scraper.parse_page(content, identifiers)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    soup = scraper.parse_page(content, identifiers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del soup
+
+    return statistics.median(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    snapshots = load_snapshots(args.dir)
+    if not snapshots:
+        print("No snapshots to benchmark.")
+        return
+
+    print(f"{'page':<60} {'parser':<12} {'mode':<8} {'median ms':>10} {'peak KiB':>10}")
+    for url, identifiers, content in snapshots:
+        baseline = None
+        for html_parser in PARSERS:
+            for partial in (False, True):
+                scraper = ParserBench()
+                scraper.HTML_PARSER = html_parser
+                scraper.PARTIAL_PARSING = partial
+                median, peak = measure(scraper, content, identifiers, args.repeat)
+                if baseline is None:
+                    baseline = median
+                mode = "partial" if partial else "full"
+                print(
+                    f"{snapshot_name(url):<60} {html_parser:<12} {mode:<8} "
+                    f"{median * 1000:>10.2f} {peak / 1024:>10.1f}"
+                    f"  ({baseline / median:.1f}x)"
+                )
+
+
+if __name__ == "__main__":
+    main()
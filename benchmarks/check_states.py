@@ -0,0 +1,83 @@
+"""Confere a resolução de Cidade/Estado pelo índice contra a busca linha a linha original.
+
+Uso: python -m benchmarks.check_states
+
+Compara ScootCepeaScrape.split_state_city com a implementação anterior (apply sobre o
+DataFrame de STATES) em textos de UF representativos das tabelas Scot e do CEPEA.
+"""
+import re
+import sys
+
+import pandas as pd
+
+from scrape.scoot_cepea import ScootCepeaScrape
+
+# UF -> (Cidade, Estado) produzidos pela busca original, peculiaridades incluídas
+SAMPLES = {
+    "MG - Triângulo": ("- TRIÂNGULO", "MG"),
+    "Goiás Goiânia": ("GOIÁS GOIÂNIA", "GO"),
+    "PR": ("LONDRINA", "PR"),
+    "17/10/2026": ("17/10/2026", ""),
+    "SP Noroeste": ("NOROESTE", "SP"),
+    "SP": ("SÃO PAULO", "SP"),
+    "MT Cuiabá": ("CUIABÁ", "MT"),
+    "GO": ("GOIÂNIA", "GO"),
+    "Mato Grosso do Sul - Dourados": ("MATO GROSSO DO SUL - DOURADOS", "MS"),
+    "RS Oeste (à vista)": ("OESTE (À VISTA)", "RS"),
+    "BA Sul": ("SUL", "BA"),
+    "MS Campo Grande": ("CAMPO GRANDE", "MS"),
+    "Pará - Marabá": ("PARÁ - MARABÁ", "PA"),
+    "TO Sul": ("SUL", "TO"),
+    "RO": ("PORTO VELHO", "RO"),
+}
+
+
+def row_wise_split(scraper, df_states, uf):
+    """split_state_city antes do índice: filtro com apply em cada chamada"""
+    original_uf = uf
+    splited_data = scraper.split_strings(uf)
+    if len(splited_data) == 2:
+        uf = splited_data[0]
+    elif len(splited_data) > 2:
+        if re.search("-", original_uf):
+            uf = original_uf.split("-")[0].strip()
+        else:
+            uf = " ".join(splited_data)
+
+    states = df_states[
+        df_states.apply(lambda row: uf in row["acronym"] or uf in row["name"], axis=1)
+    ]
+    if not states.empty:
+        state_acronym = states.iloc[0]["acronym"]
+        city = original_uf.replace(states.iloc[0]["acronym"], "").strip()
+    else:
+        city, state_acronym = original_uf, ""
+
+    if not city:
+        city = states.iloc[0]["capital"]
+
+    return city.upper(), state_acronym.upper()
+
+
+def main():
+    scraper = ScootCepeaScrape()
+    df_states = pd.DataFrame(ScootCepeaScrape.STATES)
+    failures = 0
+    for uf, expected in SAMPLES.items():
+        reference = row_wise_split(scraper, df_states, uf)
+        result = scraper.split_state_city(uf)
+        ok = result == reference == expected
+        failures += not ok
+        print(f"{'ok ' if ok else 'FAIL'} {uf!r:36} {result} (original: {reference})")
+
+    resolved = scraper.resolve_state_city(pd.Series(list(SAMPLES) * 2))
+    expected_frame = list(SAMPLES.values()) * 2
+    if list(zip(resolved["Cidade"], resolved["Estado"])) != expected_frame:
+        failures += 1
+        print("FAIL resolve_state_city differs from split_state_city")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""Compara dois resultados de benchmarks.run e aponta regressões.
+
+Uso: python -m benchmarks.compare base.json novo.json [--threshold 0.10]
+
+Sai com código 1 quando alguma etapa fica mais lenta que o limite informado.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    base, new = load(args.base), load(args.new)
+    print(f"base {base['commit']} ({base['timestamp']}) -> new {new['commit']} ({new['timestamp']})")
+    if base["config"] != new["config"]:
+        print(f"Warning: different configs {base['config']} vs {new['config']}")
+
+    regressions = []
+    for name, stats in new["stages"].items():
+        previous = base["stages"].get(name)
+        if not previous:
+            print(f"{name:<90} {'new':>10}")
+            continue
+
+        ratio = stats["median"] / previous["median"] if previous["median"] else float("inf")
+        flag = ""
+        if ratio > 1 + args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(
+            f"{name:<90} {previous['median'] * 1000:>9.2f} -> "
+            f"{stats['median'] * 1000:>9.2f} ms ({ratio:.2f}x){flag}"
+        )
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Grava snapshots das páginas usadas pelos scrapers para os benchmarks offline.
+
+Uso: python -m benchmarks.record [--dir benchmarks/snapshots]
+"""
+import argparse
+import os
+
+from benchmarks.snapshots import SNAPSHOT_DIR, scraper_pages, snapshot_name
+from scrape.base import ScrapeBase
+
+
+class Recorder(ScrapeBase):
+    CACHE_DIR = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    recorder = Recorder()
+    for url, _ in scraper_pages():
+        content = recorder.download(url)
+        if content is None:
+            continue
+
+        path = os.path.join(args.dir, snapshot_name(url))
+        with open(path, "wb") as file:
+            file.write(content)
+        print(f"{url} -> {path} ({len(content)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
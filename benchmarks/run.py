@@ -0,0 +1,177 @@
+"""Benchmark offline dos scrapers, etapa por etapa, servindo snapshots localmente.
+
+Uso: python -m benchmarks.run [--latency 0.05] [--jitter 0.02] [--repeat 5]
+
+Os resultados são gravados em benchmarks/results/<data>-<commit>.json e podem ser
+comparados com python -m benchmarks.compare.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.server import SnapshotServer
+from benchmarks.snapshots import SNAPSHOT_DIR, missing_snapshots, snapshot_name
+from scrape.b3 import B3Scrape
+from scrape.scoot_cepea import ScootCepeaScrape
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def local_scraper(scraper_class, server, output_dir):
+    """Subclasse do scraper que busca os snapshots no servidor local, sem cache, histórico,
+    rastreador de mudanças nem locks
+
+    Sem o rastreador, toda repetição refaz extract/transform em vez de medir o atalho das
+    tabelas inalteradas, e os snapshots não entram no último resultado bom da produção.
+    """
+
+    class LocalScraper(scraper_class):
+        CACHE_DIR = None
+        HISTORY_DB = None
+        CHANGES_DIR = None
+        LOCK_DIR = None
+        OUTPUT_CSV_DIR = output_dir
+
+        def download(self, url, headers=None):
+            return super().download(server.local_url(url), headers)
+
+    LocalScraper.__name__ = scraper_class.__name__
+    return LocalScraper()
+
+
+def timed(function, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+
+    return result, {
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "max": max(timings),
+        "runs": repeat,
+    }
+
+
+def build_customize_input(scot, soups):
+    """Monta a entrada do customize_df passando as páginas já baixadas pelo pipeline"""
+    data = []
+    selectors = scot.get_page_selectors()
+    for extract in scot.get_extracts():
+        soup = soups.get(extract["url"])
+        if not soup:
+            continue
+        tables = scot.select_tables(extract["url"], soup, selectors[extract["url"]])
+        for params in extract["params"]:
+            item = scot.process_table(extract["url"], tables.get(params["title"]), params)
+            if item is not None:
+                data.append(item)
+
+    return data
+
+
+def run_benchmarks(server, output_dir, repeat):
+    stages = {}
+    scot = local_scraper(ScootCepeaScrape, server, output_dir)
+    b3 = local_scraper(B3Scrape, server, output_dir)
+
+    soups = {}
+    pages = {}
+    pages.update(scot.get_page_table_identifiers())
+    pages.update(b3.get_page_table_identifiers())
+    for url, identifiers in pages.items():
+        soups[url], stages[f"fetch_page_content[{snapshot_name(url)}]"] = timed(
+            lambda: scot.fetch_page_content(url, table_identifiers=identifiers), repeat
+        )
+
+    selectors = scot.get_page_selectors()
+    for extract in scot.get_extracts():
+        soup = soups.get(extract["url"])
+        if not soup:
+            continue
+        _, stages[f"select_tables[{snapshot_name(extract['url'])}]"] = timed(
+            lambda: selectors[extract["url"]].select(soup), repeat
+        )
+        for params in extract["params"]:
+            if params.get("extractor"):
+                continue
+            _, stages[f"extract_table_data[{params['title']}]"] = timed(
+                lambda: scot.extract_table_data(
+                    soup, params["table_identifiers"], params["headers"]
+                ),
+                repeat,
+            )
+
+    _, stages["process_table"] = timed(lambda: build_customize_input(scot, soups), repeat)
+    data = build_customize_input(scot, soups)
+    _, stages["customize_df"] = timed(lambda: scot.customize_df(data), repeat)
+    _, stages["ScootCepeaScrape.execute"] = timed(scot.execute, repeat)
+    _, stages["B3Scrape.execute"] = timed(b3.execute, repeat)
+
+    return stages
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    missing = missing_snapshots(args.dir)
+    if missing:
+        parser.error(
+            f"no snapshot in {args.dir} for {', '.join(missing)}; "
+            "record them with python -m benchmarks.record"
+        )
+
+    with tempfile.TemporaryDirectory() as output_dir, SnapshotServer(
+        args.dir, latency=args.latency, jitter=args.jitter
+    ) as server:
+        stages = run_benchmarks(server, output_dir, args.repeat)
+
+    commit = current_commit()
+    result = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {"latency": args.latency, "jitter": args.jitter, "repeat": args.repeat},
+        "stages": stages,
+    }
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(
+        args.output, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit}.json"
+    )
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(result, file, indent=2)
+
+    for name, stats in stages.items():
+        print(f"{name:<90} {stats['median'] * 1000:>10.2f} ms")
+    print(f"Results saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
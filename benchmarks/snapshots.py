@@ -0,0 +1,45 @@
+import os
+import re
+from urllib.parse import urlsplit
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(__file__), "snapshots")
+
+
+def snapshot_name(url):
+    """Nome do arquivo de snapshot de uma url (host + caminho, sem query string)"""
+    parts = urlsplit(url)
+    slug = re.sub(r"[^a-z0-9]+", "-", f"{parts.netloc}{parts.path}".lower()).strip("-")
+    return f"{slug}.html"
+
+
+def scraper_pages():
+    """Lista (url, identificadores de tabela) de todas as páginas usadas pelos scrapers"""
+    from scrape.b3 import B3Scrape
+    from scrape.scoot_cepea import ScootCepeaScrape
+
+    pages = {}
+    pages.update(ScootCepeaScrape().get_page_table_identifiers())
+    pages.update(B3Scrape().get_page_table_identifiers())
+    return list(pages.items())
+
+
+def missing_snapshots(directory=SNAPSHOT_DIR):
+    """Urls dos scrapers que ainda não têm snapshot gravado em directory"""
+    return [
+        url
+        for url, _ in scraper_pages()
+        if not os.path.exists(os.path.join(directory, snapshot_name(url)))
+    ]
+
+
+def load_snapshots(directory=SNAPSHOT_DIR):
+    """Carrega os snapshots existentes: lista (url, identificadores, conteúdo)"""
+    snapshots = []
+    for url, identifiers in scraper_pages():
+        path = os.path.join(directory, snapshot_name(url))
+        if not os.path.exists(path):
+            print(f"Snapshot not found for {url}: {path}")
+            continue
+        with open(path, "rb") as file:
+            snapshots.append((url, identifiers, file.read()))
+    return snapshots
@@ -1,9 +1,160 @@
+import math
+import os
 from datetime import datetime
 
+import pyarrow as pa
 import streamlit as st
 
+from scrape.analytics import HistoryAnalytics
 from scrape.b3 import B3Scrape
+from scrape.base import ScrapeBase
+from scrape.refresher import BackgroundRefresher
 from scrape.scoot_cepea import ScootCepeaScrape
+from scrape.snapshots import SnapshotStore
+from scrape.transforms import format_ptbr_frame
+
+REFRESH_TTL_SECONDS = int(os.environ.get("SCRAPE_REFRESH_TTL", 15 * 60))
+SNAPSHOT_DIR = os.environ.get("SCRAPE_SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_MAX_AGE_SECONDS = int(os.environ.get("SCRAPE_SNAPSHOT_MAX_AGE", 60 * 60))
+STALE_MESSAGE = "Fonte indisponível no momento: exibindo o último resultado obtido."
+LOADING_POLL_SECONDS = 1
+PAGE_SIZE = int(os.environ.get("SCRAPE_PAGE_SIZE", 50))
+SOURCES = {
+    "scot": {
+        "title": "Dados Scot",
+        "scraper": ScootCepeaScrape,
+        "refresh": int(os.environ.get("SCRAPE_REFRESH_TTL_SCOT", REFRESH_TTL_SECONDS)),
+    },
+    "b3": {
+        "title": "Dados Notícias Agricolas",
+        "scraper": B3Scrape,
+        "refresh": int(os.environ.get("SCRAPE_REFRESH_TTL_B3", REFRESH_TTL_SECONDS)),
+    },
+    "analytics": {
+        "title": "Indicadores do histórico",
+        "scraper": None,
+        "refresh": int(os.environ.get("SCRAPE_REFRESH_TTL_ANALYTICS", REFRESH_TTL_SECONDS)),
+    },
+}
+
+
+def load_source(source):
+    """Quadros de uma fonte prontos para exibição: do snapshot do daemon ou executando o scraper
+
+    Cada quadro é formatado e convertido para Arrow uma única vez por atualização e
+    reaproveitado por todas as sessões e reruns.
+    """
+    scraper_class = SOURCES[source]["scraper"]
+    if scraper_class is None:
+        return load_analytics()
+
+    data, manifest = SnapshotStore(SNAPSHOT_DIR).load(as_pandas=False, sources=[source])
+    created_at = manifest and datetime.fromisoformat(manifest["created_at"])
+    # um snapshot velho demais indica que o daemon parou: volta a raspar no processo
+    if data and (datetime.now() - created_at).total_seconds() <= SNAPSHOT_MAX_AGE_SECONDS:
+        frames = data.get(source, {})
+        stale = {
+            frame["title"]
+            for frame in manifest["frames"]
+            if frame["source"] == source and frame.get("stale")
+        }
+    else:
+        scraper = scraper_class()
+        frames = scraper.execute()
+        created_at = datetime.now()
+        stale = set(scraper.metrics.stale)
+
+    return {
+        "frames": {
+            title: render_frame(frame, scraper_class.DISPLAY_DECIMALS)
+            for title, frame in frames.items()
+        },
+        "stale": stale,
+        "created_at": created_at,
+    }
+
+
+def load_analytics():
+    """Indicadores materializados sobre os CSVs datados: lê só os arquivos novos e
+    mostra a última linha de cada série e de cada spread"""
+    analytics = HistoryAnalytics(ScrapeBase.OUTPUT_CSV_DIR)
+    analytics.update()
+    return {
+        "frames": {
+            "Séries": render_frame(analytics.latest(spreads=False), ScrapeBase.DISPLAY_DECIMALS),
+            "Spreads": render_frame(analytics.latest(spreads=True), ScrapeBase.DISPLAY_DECIMALS),
+        },
+        "stale": set(),
+        "created_at": datetime.now(),
+    }
+
+
+def render_frame(frame, decimals):
+    """Formata o quadro tipado para exibição (números no padrão brasileiro) em Arrow"""
+    if hasattr(frame, "to_pandas"):
+        frame = frame.to_pandas()
+    return pa.Table.from_pandas(format_ptbr_frame(frame, decimals), preserve_index=False)
+
+
+@st.cache_resource
+def get_refresher(source):
+    """Refresher único por processo e fonte, compartilhado entre sessões e abas"""
+    return BackgroundRefresher(
+        lambda: load_source(source), ttl=SOURCES[source]["refresh"]
+    )
+
+
+def show_table(key, table):
+    """Mostra a tabela; acima de PAGE_SIZE linhas só a página escolhida vai para o navegador"""
+    if table.num_rows <= PAGE_SIZE:
+        st.dataframe(table, hide_index=True, use_container_width=True)
+        return
+
+    pages = math.ceil(table.num_rows / PAGE_SIZE)
+    page = st.number_input("Página", min_value=1, max_value=pages, value=1, key=f"page-{key}")
+    st.dataframe(
+        table.slice((page - 1) * PAGE_SIZE, PAGE_SIZE),
+        hide_index=True,
+        use_container_width=True,
+    )
+    st.caption(f"{table.num_rows} linhas, página {page} de {pages}")
+
+
+def source_panel(source, loading):
+    """Painel de uma fonte; roda como fragmento e se atualiza sem redesenhar o resto da página"""
+    config = SOURCES[source]
+    refresher = get_refresher(source)
+    # nunca espera: uma atualização em andamento aparece no próximo run_every do fragmento
+    payload, _ = refresher.get(wait=False)
+
+    if payload is None:
+        st.title(config["title"])
+        if refresher.refreshing:
+            st.info("Carregando cotações...")
+        else:
+            st.error("Não foi possível carregar as cotações. Tente novamente em instantes.")
+        return
+
+    if loading:
+        # O fragmento foi registrado com o intervalo de carregamento; redesenha a página
+        # para registrá-lo de novo com o intervalo de atualização da fonte
+        st.rerun()
+
+    today = payload["created_at"].strftime("%d/%m/%Y %H:%M")
+    st.title(f'{config["title"]} em {today}')
+    st.caption(
+        f"Última atualização: {today}"
+        + (" (atualizando em segundo plano...)" if refresher.refreshing else "")
+    )
+
+    frames = payload["frames"]
+    columns = st.columns(max(len(frames), 1))
+    for i, title in enumerate(frames):
+        with columns[i]:
+            st.header(title)
+            if title in payload["stale"]:
+                st.warning(STALE_MESSAGE)
+            show_table(f"{source}-{title}", frames[title])
 
 
 def main():
@@ -26,26 +177,14 @@ def main():
     """
     st.html(code)
     st.logo("logo.svg")
-    scot = ScootCepeaScrape()
-    b3 = B3Scrape()
-    data_scot = scot.execute()
-    data_b3 = b3.execute()
-
-    today = datetime.now().strftime("%d/%m/%Y %H:%M")
-
-    st.title(f'Dados Scot em {today}')
-    columns = st.columns(len(data_scot))
-    for i, title in enumerate(data_scot):
-        with columns[i]:
-            st.header(title)
-            st.dataframe(data_scot[title], hide_index=True, use_container_width=True)
-
-    st.title(f'Dados Notícias Agricolas em {today}')
-    columns = st.columns(len(data_b3))
-    for i, title in enumerate(data_b3):
-        with columns[i]:
-            st.header(title)
-            st.dataframe(data_b3[title], hide_index=True, use_container_width=True)
+    # Cada fonte é um fragmento independente: aparece assim que fica pronta e é
+    # reexecutado no próprio intervalo, reenviando só os quadros dessa fonte
+    for source, config in SOURCES.items():
+        payload, _ = get_refresher(source).get(wait=False)
+        loading = payload is None
+        run_every = LOADING_POLL_SECONDS if loading else config["refresh"]
+        with st.container():
+            st.fragment(source_panel, run_every=run_every)(source, loading)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,8 @@
+import sys
+import time
+
+started_at = time.perf_counter()
+
+from scrape.cli import main  # noqa: E402
+
+sys.exit(main(started_at=started_at))
@@ -0,0 +1,363 @@
+"""Indicadores incrementais sobre os CSVs datados gravados em output/.
+
+Uso: python -m scrape.analytics [--output-dir output] [--window 5] [--rebuild]
+
+Cada execução lê só os arquivos AAAA-MM-DD-*.csv(.gz) novos ou alterados desde a
+anterior (registrados em analytics/manifest.json), extrai deles uma observação por
+série e dia e atualiza, só a partir da data mais antiga que mudou em cada série:
+- média móvel de window observações
+- variação sobre a observação anterior (dia a dia)
+- comparação com o valor de um ano antes, vindo do próprio histórico ou, enquanto ele
+  não cobre um ano, da coluna "Valor <ano anterior>" das tabelas (a mesma que o
+  pivoting_year empilha para um único dia)
+- spreads entre séries (B3 x Scot/CEPEA) e valores convertidos pelo Dólar B3
+
+Os resultados ficam materializados em Arrow (observations.arrow e indicators.arrow)
+e são lidos pelo dashboard.
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from scrape.singleflight import file_lease
+from scrape.transforms import parse_ptbr_number
+
+SCHEMA_VERSION = 2
+ROLLING_WINDOW = 5
+MATCH_TOLERANCE = pd.Timedelta(days=7)
+DATED_FILE_EXPRESSION = r"^(\d{4}-\d{2}-\d{2})-(.+\.csv)(?:\.gz)?$"
+PREVIOUS_YEAR_EXPRESSION = r"^Valor (\d{4})$"
+OBSERVATION_COLUMNS = ["Data", "Série", "Valor", "Valor ano anterior"]
+INDICATOR_COLUMNS = [
+    "Data",
+    "Série",
+    "Valor",
+    "Média móvel",
+    "Variação dia (%)",
+    "Valor ano anterior",
+    "Variação ano (%)",
+]
+
+# série derivada -> (série da esquerda, operação, série da direita)
+SPREADS = {
+    "B3 - Scot Boi Gordo SP": ("B3 Boi Gordo", "-", "Scot BOI GORDO SP"),
+    "B3 - CEPEA Boi Gordo": ("B3 Boi Gordo", "-", "CEPEA Boi Gordo"),
+    "B3 Boi Gordo (US$)": ("B3 Boi Gordo", "/", "Dólar B3"),
+    "CEPEA Boi Gordo (US$)": ("CEPEA Boi Gordo", "/", "Dólar B3"),
+    "Scot BOI GORDO SP (US$)": ("Scot BOI GORDO SP", "/", "Dólar B3"),
+}
+
+
+def first_value(series):
+    """Primeira linha da tabela (cotação do dia ou vencimento mais próximo)"""
+
+    def read(df):
+        values = parse_ptbr_number(df["Valor"]).dropna()
+        return [(series, values.iloc[0], np.nan)] if len(values) else []
+
+    return read
+
+
+def resumo_values(df):
+    """Média do Resumo Scot por Tipo e Estado; a linha do CEPEA vem do cpea.csv
+
+    As linhas do boi China (Cidade CHINA) levam o prêmio de exportação e viram séries
+    próprias (Scot BOI GORDO CHINA SP), fora da média do mercado físico.
+    """
+    df = df[df["Estado"] != "CEPEA"]
+    china = df["Cidade"] == "CHINA"
+    df = df.assign(
+        Tipo=df["Tipo"].where(~china, df["Tipo"] + " CHINA"),
+        Valor=parse_ptbr_number(df["Valor"]),
+    )
+    means = df.groupby(["Tipo", "Estado"], sort=False)["Valor"].mean().dropna()
+    return [(f"Scot {tipo} {estado}", value, np.nan) for (tipo, estado), value in means.items()]
+
+
+def yearly_values(prefix):
+    """Tabelas com Valor do ano corrente e do anterior (Boi no mundo, Atacado)"""
+
+    def read(df):
+        item = df.columns[0]
+        previous = next((column for column in df.columns if re.match(PREVIOUS_YEAR_EXPRESSION, column)), None)
+        values = parse_ptbr_number(df["Valor"])
+        last_year = parse_ptbr_number(df[previous]) if previous else pd.Series(np.nan, index=df.index)
+        return [
+            (f"{prefix} {name}", value, previous_value)
+            for name, value, previous_value in zip(df[item], values, last_year)
+            if not pd.isna(value)
+        ]
+
+    return read
+
+
+# arquivo do dia (sem data) -> leitor que devolve [(série, valor, valor do ano anterior)]
+FILE_SERIES = {
+    "boi_gordo_b3.csv": first_value("B3 Boi Gordo"),
+    "dolar_b3.csv": first_value("Dólar B3"),
+    "cpea.csv": first_value("CEPEA Boi Gordo"),
+    "resumo.csv": resumo_values,
+    "boi_no_mundo.csv": yearly_values("Boi no mundo"),
+    "atacado.csv": yearly_values("Atacado"),
+}
+
+
+class HistoryAnalytics:
+    """Observações e indicadores materializados a partir dos CSVs datados de output_dir"""
+
+    MANIFEST_FILE = "manifest.json"
+    OBSERVATIONS_FILE = "observations.arrow"
+    INDICATORS_FILE = "indicators.arrow"
+    LOCK_FILE = ".lock"
+    LOCK_TIMEOUT = 60
+
+    def __init__(self, output_dir="output", directory=None, window=ROLLING_WINDOW):
+        self.output_dir = output_dir
+        self.directory = directory or os.path.join(output_dir, "analytics")
+        self.window = window
+
+    def update(self, rebuild=False):
+        """Ingere os arquivos novos ou alterados e atualiza os indicadores
+
+        Retorna {"files": arquivos lidos, "series": {série: primeira data recalculada}}.
+        Se outro processo estiver atualizando, espera por ele e só lê o que ele não leu.
+        """
+        with file_lease(os.path.join(self.directory, self.LOCK_FILE), self.LOCK_TIMEOUT):
+            return self._update(rebuild)
+
+    def load(self):
+        """(observações, indicadores) materializados; quadros vazios se ainda não houver"""
+        return (
+            self._read_frame(self.OBSERVATIONS_FILE, OBSERVATION_COLUMNS),
+            self._read_frame(self.INDICATORS_FILE, INDICATOR_COLUMNS),
+        )
+
+    def latest(self, spreads=None):
+        """Última linha de indicadores de cada série; spreads=True/False filtra as derivadas"""
+        _, indicators = self.load()
+        if spreads is not None:
+            indicators = indicators[indicators["Série"].isin(SPREADS) == spreads]
+        latest = indicators.sort_values("Data").groupby("Série", observed=True).tail(1)
+        return latest.sort_values("Série").reset_index(drop=True)
+
+    def _update(self, rebuild):
+        manifest = self._read_manifest()
+        if rebuild or manifest.get("schema") != SCHEMA_VERSION or manifest.get("window") != self.window:
+            manifest = {"schema": SCHEMA_VERSION, "window": self.window, "files": {}}
+            observations = _empty(OBSERVATION_COLUMNS)
+            indicators = _empty(INDICATOR_COLUMNS)
+        else:
+            observations, indicators = self.load()
+
+        files = self.pending_files(manifest)
+        if not files:
+            return {"files": [], "series": {}}
+
+        rows = []
+        for name, day, path, stat in files:
+            rows += [(day, *row) for row in FILE_SERIES[name](pd.read_csv(path, dtype=str))]
+            manifest["files"][os.path.basename(path)] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+        new = _frame(rows)
+        observations = _upsert(observations, new)
+        changed = new.groupby("Série", observed=True)["Data"].min().to_dict()
+
+        spreads = compute_spreads(observations, changed)
+        observations = _upsert(observations, spreads)
+        changed.update(spreads.groupby("Série", observed=True)["Data"].min().to_dict())
+
+        indicators = update_indicators(observations, indicators, changed, self.window)
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._write_frame(self.OBSERVATIONS_FILE, observations)
+        self._write_frame(self.INDICATORS_FILE, indicators)
+        # o manifest vai por último: se algo falhar antes, os arquivos são lidos de novo
+        self._write_manifest(manifest)
+        return {"files": [os.path.basename(path) for _, _, path, _ in files], "series": changed}
+
+    def pending_files(self, manifest):
+        """Arquivos datados conhecidos que ainda não foram lidos ou mudaram desde a leitura"""
+        try:
+            names = sorted(os.listdir(self.output_dir))
+        except FileNotFoundError:
+            return []
+
+        files = []
+        for file_name in names:
+            match = re.match(DATED_FILE_EXPRESSION, file_name)
+            if not match or match.group(2) not in FILE_SERIES:
+                continue
+            path = os.path.join(self.output_dir, file_name)
+            stat = os.stat(path)
+            seen = manifest["files"].get(file_name)
+            if seen and seen["size"] == stat.st_size and seen["mtime_ns"] == stat.st_mtime_ns:
+                continue
+            files.append((match.group(2), pd.Timestamp(match.group(1)), path, stat))
+        return files
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.directory, self.MANIFEST_FILE), encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, manifest):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, ensure_ascii=False, indent=2)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, os.path.join(self.directory, self.MANIFEST_FILE))
+
+    def _read_frame(self, file_name, columns):
+        try:
+            source = pa.memory_map(os.path.join(self.directory, file_name), "r")
+        except (FileNotFoundError, pa.ArrowIOError):
+            return _empty(columns)
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+    def _write_frame(self, file_name, df):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        os.close(fd)
+        os.chmod(temp_path, 0o644)
+        with pa.OSFile(temp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temp_path, os.path.join(self.directory, file_name))
+
+
+def compute_spreads(observations, changed):
+    """Observações das séries derivadas cujas pernas mudaram, a partir da primeira data alterada
+
+    A perna da direita vale a última observação até a data (o dólar pode não ter sido
+    coletado no mesmo dia).
+    """
+    frames = []
+    for series, (left, operation, right) in SPREADS.items():
+        starts = [changed[leg] for leg in (left, right) if leg in changed]
+        if not starts:
+            continue
+
+        left_values = _series(observations, left)
+        left_values = left_values[left_values["Data"] >= min(starts)]
+        right_values = _series(observations, right)
+        if left_values.empty or right_values.empty:
+            continue
+
+        merged = pd.merge_asof(
+            left_values[["Data", "Valor"]],
+            right_values[["Data", "Valor"]].rename(columns={"Valor": "Direita"}),
+            on="Data",
+            direction="backward",
+            tolerance=MATCH_TOLERANCE,
+        )
+        values = merged["Valor"] - merged["Direita"] if operation == "-" else merged["Valor"] / merged["Direita"]
+        frames.append(pd.DataFrame({"Data": merged["Data"], "Série": series, "Valor": values}).dropna())
+
+    if not frames:
+        return _empty(OBSERVATION_COLUMNS)
+    return _frame(pd.concat(frames, ignore_index=True).reindex(columns=OBSERVATION_COLUMNS))
+
+
+def update_indicators(observations, indicators, changed, window):
+    """Recalcula os indicadores de cada série alterada só a partir da data que mudou
+
+    Usa as window - 1 observações anteriores como contexto da média móvel e da variação
+    diária; as linhas anteriores a essa data ficam como estavam.
+    """
+    frames = []
+    for series, start in changed.items():
+        history = _series(observations, series)
+        position = int(history["Data"].searchsorted(start))
+        context = history.iloc[max(0, position - max(window - 1, 1)) :].reset_index(drop=True)
+
+        previous = context["Valor"].shift(1)
+        year_ago = pd.merge_asof(
+            pd.DataFrame({"Alvo": context["Data"] - pd.DateOffset(years=1)}),
+            history[["Data", "Valor"]].rename(columns={"Data": "Alvo", "Valor": "Histórico"}),
+            on="Alvo",
+            direction="nearest",
+            tolerance=MATCH_TOLERANCE,
+        )["Histórico"]
+        last_year = year_ago.fillna(context["Valor ano anterior"])
+
+        computed = pd.DataFrame(
+            {
+                "Data": context["Data"],
+                "Série": series,
+                "Valor": context["Valor"],
+                "Média móvel": context["Valor"].rolling(window, min_periods=window).mean(),
+                "Variação dia (%)": _change(context["Valor"], previous),
+                "Valor ano anterior": last_year,
+                "Variação ano (%)": _change(context["Valor"], last_year),
+            }
+        )
+        frames.append(computed[computed["Data"] >= start])
+
+    if not frames:
+        return indicators
+
+    starts = indicators["Série"].astype(str).map(changed)
+    kept = indicators[~(indicators["Data"] >= starts)]
+    result = pd.concat([kept.astype({"Série": str}), *frames], ignore_index=True)
+    return _typed(result.sort_values(["Série", "Data"], ignore_index=True), INDICATOR_COLUMNS)
+
+
+def _change(values, base):
+    """Variação percentual; sem base (zero, comum em spreads) fica vazia em vez de infinita"""
+    return ((values / base - 1) * 100).replace([np.inf, -np.inf], np.nan)
+
+
+def _series(observations, series):
+    values = observations[observations["Série"] == series]
+    return values.sort_values("Data", ignore_index=True)
+
+
+def _upsert(observations, new):
+    """Junta as observações novas, que substituem as de mesma Data e Série"""
+    if new.empty:
+        return observations
+    combined = pd.concat([observations.astype({"Série": str}), new.astype({"Série": str})], ignore_index=True)
+    combined = combined.drop_duplicates(["Data", "Série"], keep="last")
+    return _typed(combined.sort_values(["Série", "Data"], ignore_index=True), OBSERVATION_COLUMNS)
+
+
+def _frame(rows):
+    if isinstance(rows, pd.DataFrame):
+        return _typed(rows, OBSERVATION_COLUMNS)
+    return _typed(pd.DataFrame(rows, columns=OBSERVATION_COLUMNS), OBSERVATION_COLUMNS)
+
+
+def _typed(df, columns):
+    types = {column: "float64" for column in columns}
+    types.update({"Data": "datetime64[ns]", "Série": "category"})
+    return df[columns].astype(types)
+
+
+def _empty(columns):
+    return _typed(pd.DataFrame(columns=columns), columns)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m scrape.analytics", description=__doc__.splitlines()[0])
+    parser.add_argument("--output-dir", default="output", help="diretório dos CSVs datados")
+    parser.add_argument("--window", type=int, default=ROLLING_WINDOW, help="observações da média móvel")
+    parser.add_argument("--rebuild", action="store_true", help="ignora o manifest e relê todos os arquivos")
+    args = parser.parse_args(argv)
+
+    analytics = HistoryAnalytics(args.output_dir, window=args.window)
+    summary = analytics.update(rebuild=args.rebuild)
+    print(f"{len(summary['files'])} files ingested, {len(summary['series'])} series updated")
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(analytics.latest())
+
+
+if __name__ == "__main__":
+    main()
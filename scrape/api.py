@@ -0,0 +1,385 @@
+"""API HTTP local de leitura dos quadros publicados pelo daemon.
+
+Uso: python -m scrape.api [--host 127.0.0.1] [--port 8502] [--snapshot-dir snapshots]
+                          [--refresh 900]
+
+Rotas:
+- GET /frames: fontes e quadros da versão mais recente, com colunas, linhas e ETag
+- GET /frames/<fonte>/<quadro>[.json|.arrow]: um quadro em JSON ({"columns", "data"})
+  ou em Arrow IPC stream (também por format=arrow ou Accept: application/vnd.apache.arrow.stream)
+
+O quadro é servido tipado, sem a formatação brasileira da tela. Parâmetros de filtro:
+columns=Tipo,Valor escolhe colunas; <coluna>=SP,MT filtra por valores;
+<coluna>__gte, __gt, __lte e __lt filtram por faixa; offset e limit paginam.
+
+As respostas são comprimidas com gzip quando o cliente aceita e levam ETag forte,
+derivado do conteúdo do quadro e dos parâmetros: com If-None-Match igual a resposta é
+304 sem corpo, e um quadro que não mudou entre versões mantém a mesma ETag.
+Com --refresh o próprio processo executa os scrapers e publica as versões.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from scrape.snapshots import SnapshotStore, _slug
+
+SNAPSHOT_DIR = "snapshots"
+DEFAULT_PORT = 8502
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+JSON = "application/json"
+RESPONSE_CACHE_SIZE = 128
+RESERVED_PARAMS = ("columns", "offset", "limit", "format")
+OPERATORS = {
+    "gte": pc.greater_equal,
+    "gt": pc.greater,
+    "lte": pc.less_equal,
+    "lt": pc.less,
+}
+
+Frame = namedtuple("Frame", ["source", "title", "table", "stale", "digest"])
+
+
+class QueryError(ValueError):
+    """Parâmetro de consulta inválido (coluna inexistente, valor que não converte)"""
+
+
+class SnapshotFrames:
+    """Quadros da versão mais recente do SnapshotStore, recarregados quando ela muda
+
+    As tabelas ficam em memory-map; o digest de cada quadro vem do conteúdo da tabela,
+    então não muda quando o daemon publica de novo os mesmos dados.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.version = None
+        self.manifest = None
+        self.frames = {}
+        self._lock = threading.Lock()
+
+    def current(self):
+        """(versão, manifest, {(fonte, slug do título): Frame}) da versão mais recente"""
+        version = self.store.latest_version()
+        with self._lock:
+            if version != self.version:
+                self._load(version)
+            return self.version, self.manifest, self.frames
+
+    def get(self, source, title):
+        _, _, frames = self.current()
+        return frames.get((_slug(source), _slug(unquote(title))))
+
+    def _load(self, version):
+        data, manifest = self.store.load(version, as_pandas=False) if version else (None, None)
+        frames = {}
+        for entry in (manifest or {}).get("frames", []):
+            table = data[entry["source"]][entry["title"]]
+            frames[(_slug(entry["source"]), _slug(entry["title"]))] = Frame(
+                entry["source"], entry["title"], table, entry.get("stale", False), _table_digest(table)
+            )
+
+        self.version, self.manifest, self.frames = version, manifest, frames
+
+
+def parse_query(query):
+    """Separa a query string em (colunas, filtros, offset, limit, formato)
+
+    filtros é uma lista de (coluna, operador, valores), com operador "in" ou um de OPERATORS.
+    """
+    params = parse_qsl(query, keep_blank_values=True)
+    options = {key: value for key, value in params if key in RESERVED_PARAMS}
+    columns = [name for name in options.get("columns", "").split(",") if name] or None
+
+    filters = []
+    for key, value in params:
+        if key in RESERVED_PARAMS:
+            continue
+        name, _, operator = key.rpartition("__")
+        if not name or operator not in OPERATORS:
+            name, operator = key, "in"
+        filters.append((name, operator, value.split(",") if operator == "in" else [value]))
+
+    try:
+        offset = int(options.get("offset") or 0)
+        limit = int(options["limit"]) if options.get("limit") else None
+    except ValueError as error:
+        raise QueryError(f"offset and limit must be integers: {error}") from None
+    if offset < 0 or (limit is not None and limit < 0):
+        raise QueryError("offset and limit must not be negative")
+
+    return columns, filters, offset, limit, options.get("format")
+
+
+def filter_table(table, columns=None, filters=(), offset=0, limit=None):
+    """Aplica os filtros de linha, a paginação e a seleção de colunas na tabela Arrow"""
+    mask = None
+    for name, operator, values in filters:
+        column = _column(table, name)
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(column.type.value_type)
+        try:
+            scalars = pa.array(values).cast(column.type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as error:
+            raise QueryError(f"Invalid value for {name}: {error}") from None
+
+        if operator == "in":
+            condition = pc.is_in(column, value_set=scalars)
+        else:
+            condition = OPERATORS[operator](column, scalars[0])
+        mask = condition if mask is None else pc.and_(mask, condition)
+
+    if mask is not None:
+        table = table.filter(mask)
+    if offset or limit is not None:
+        table = table.slice(offset, limit)
+    if columns:
+        table = table.select([_column_name(table, name) for name in columns])
+    return table
+
+
+def encode_json(frame, table):
+    columns = table.column_names
+    data = list(zip(*(table.column(name).to_pylist() for name in columns))) if columns else []
+    body = {
+        "source": frame.source,
+        "title": frame.title,
+        "stale": frame.stale,
+        "columns": columns,
+        "data": data,
+    }
+    return json.dumps(body, ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+def encode_arrow(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, frames):
+        super().__init__(address, ApiHandler)
+        self.frames = frames
+        self.responses = {}
+        self.responses_lock = threading.Lock()
+
+    def cached_response(self, etag, build):
+        """Corpo já codificado da ETag, montado por build() só na primeira vez"""
+        with self.responses_lock:
+            body = self.responses.get(etag)
+        if body is None:
+            body = build()
+            with self.responses_lock:
+                if len(self.responses) >= RESPONSE_CACHE_SIZE:
+                    self.responses.clear()
+                self.responses[etag] = body
+        return body
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "ScrapeAPI/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def handle_request(self, send_body):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        try:
+            if parts == ["frames"] or not parts:
+                self.send_index(send_body)
+            elif len(parts) == 3 and parts[0] == "frames":
+                self.send_frame(parts[1], parts[2], url.query, send_body)
+            else:
+                self.send_error_json(HTTPStatus.NOT_FOUND, f"Unknown path {url.path}", send_body)
+        except QueryError as error:
+            self.send_error_json(HTTPStatus.BAD_REQUEST, str(error), send_body)
+
+    def send_index(self, send_body):
+        version, manifest, frames = self.server.frames.current()
+        listing = {
+            "version": version,
+            "created_at": manifest and manifest["created_at"],
+            "frames": [
+                {
+                    "source": frame.source,
+                    "title": frame.title,
+                    "path": f"/frames/{source}/{title}",
+                    "rows": frame.table.num_rows,
+                    "columns": [
+                        {"name": field.name, "type": str(field.type)} for field in frame.table.schema
+                    ],
+                    "stale": frame.stale,
+                    "etag": frame.digest,
+                }
+                for (source, title), frame in frames.items()
+            ],
+        }
+        body = json.dumps(listing, ensure_ascii=False).encode("utf-8")
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        self.send_body(JSON, etag, lambda: body, send_body)
+
+    def send_frame(self, source, title, query, send_body):
+        name, dot, extension = title.rpartition(".")
+        if dot and extension in ("json", "arrow"):
+            title = name
+        else:
+            extension = None
+
+        frame = self.server.frames.get(source, title)
+        if frame is None:
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"Frame {source}/{title} not found", send_body)
+            return
+
+        columns, filters, offset, limit, format_ = parse_query(query)
+        arrow = (extension or format_) == "arrow" or (
+            not (extension or format_) and ARROW_STREAM in self.headers.get("Accept", "")
+        )
+        content_type = ARROW_STREAM if arrow else JSON
+        canonical = sorted(parse_qsl(query, keep_blank_values=True))
+        etag = hashlib.sha256(
+            repr((frame.digest, frame.stale, content_type, canonical)).encode("utf-8")
+        ).hexdigest()[:32]
+
+        def build():
+            table = filter_table(frame.table, columns, filters, offset, limit)
+            return encode_arrow(table) if arrow else encode_json(frame, table)
+
+        self.send_body(content_type, etag, build, send_body)
+
+    def send_body(self, content_type, etag, build, send_body):
+        compress = "gzip" in self.headers.get("Accept-Encoding", "")
+        # a ETag forte identifica os bytes enviados, então muda com a codificação
+        etag = f'"{etag}-gz"' if compress else f'"{etag}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept, Accept-Encoding",
+        }
+        if self.server.frames.version:
+            headers["X-Snapshot-Version"] = self.server.frames.version
+
+        matches = _etags(self.headers.get("If-None-Match"))
+        if etag in matches or "*" in matches:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            return
+
+        body = self.server.cached_response(
+            etag, lambda: _compress(build()) if compress else build()
+        )
+        self.send_response(HTTPStatus.OK)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", content_type)
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def send_error_json(self, status, message, send_body):
+        body = json.dumps({"error": message}, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", JSON)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, snapshot_dir=SNAPSHOT_DIR, refresh=None):
+    store = SnapshotStore(snapshot_dir)
+    if refresh:
+        threading.Thread(target=_refresh_loop, args=(store, refresh), daemon=True).start()
+
+    server = ApiServer((host, port), SnapshotFrames(store))
+    print(f"Serving frames from {snapshot_dir} on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m scrape.api", description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--refresh", type=int, metavar="SECONDS",
+                        help="executa os scrapers e publica uma versão a cada SECONDS segundos")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.snapshot_dir, args.refresh)
+
+
+def _refresh_loop(store, interval):
+    from scrape.cli import load_scrapers
+    from scrape.daemon import run_once
+
+    scrapers = load_scrapers(["scot", "cepea", "b3"])
+    while True:
+        started = time.monotonic()
+        run_once(scrapers, store)
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def _table_digest(table):
+    """Hash do conteúdo da tabela Arrow (esquema e dados), independente da versão"""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return hashlib.sha256(sink.getvalue()).hexdigest()[:32]
+
+
+def _column(table, name):
+    return table.column(_column_name(table, name))
+
+
+def _column_name(table, name):
+    if name not in table.column_names:
+        raise QueryError(f"Unknown column {name}; available: {', '.join(table.column_names)}")
+    return name
+
+
+def _compress(body):
+    # mtime fixo: o mesmo conteúdo gera sempre os mesmos bytes, como exige a ETag forte
+    return gzip.compress(body, mtime=0)
+
+
+def _etags(header):
+    """ETags de If-None-Match (comparação fraca, como pede o RFC 9110)"""
+    if not header:
+        return set()
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if __name__ == "__main__":
+    main()
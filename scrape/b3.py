@@ -1,23 +1,16 @@
+from datetime import date
+
 import pandas as pd
 
 from scrape.base import ScrapeBase
+from scrape.selectors import TableSelector
+from scrape.transforms import parse_ptbr_month_year, parse_ptbr_number
 
 
 class B3Scrape(ScrapeBase):
-    MONTH_TRANSLATION = {
-        "Janeiro": "January",
-        "Fevereiro": "February",
-        "Março": "March",
-        "Abril": "April",
-        "Maio": "May",
-        "Junho": "June",
-        "Julho": "July",
-        "Agosto": "August",
-        "Setembro": "September",
-        "Outubro": "October",
-        "Novembro": "November",
-        "Dezembro": "December",
-    }
+    TABLE_IDENTIFIERS = {"class": "cot-fisicas"}
+    TABLE_SELECTOR = TableSelector({"cotacao": TABLE_IDENTIFIERS})
+    DISPLAY_DECIMALS = 4
 
     def __init__(self):
         super().__init__()
@@ -26,78 +19,107 @@ class B3Scrape(ScrapeBase):
             "Boi Gordo": {
                 "url": "https://www.noticiasagricolas.com.br/cotacoes/boi-gordo/boi-gordo-b3-prego-regular",
                 "file_name": "boi_gordo_b3.csv",
+                "month_anchor": "end",
             },
             "Dolar": {
                 "url": "https://www.noticiasagricolas.com.br/cotacoes/mercado-financeiro/dolar-b3",
                 "file_name": "dolar_b3.csv",
+                "month_anchor": "start",
+                "divisor": 1000,
             },
         }
 
         self.data_frames = {}
 
-    def execute(self) -> dict:
-        def format_currency(value):
-            return f'{value:,.4f}'.replace(',', 'X').replace('.', ',').replace('X', '.')
-
-        def translate(date_str):
-            dates = date_str.split("/")
-            months_keys = self.MONTH_TRANSLATION.keys()
-            for key, value in enumerate(dates):
-                if value in months_keys:
-                    dates[key] = self.MONTH_TRANSLATION[dates[key]]
-                    break
-
-            return "/".join(dates)
-
-        def transform_to_last_day_of_month(date_str):
-            return (
-                pd.to_datetime(translate(date_str), format="%B/%Y")
-                + pd.offsets.MonthEnd(0)
-            ).date()
-
-        def transform_to_first_day_of_month(date_str):
-            full_date_str = translate(date_str).replace("/24", "/2024")
-            return (
-                pd.to_datetime(full_date_str, format="%B/%Y") + pd.offsets.MonthBegin(0)
-            ).date()
-
-        transform_date_params = {
-            "Boi Gordo": transform_to_last_day_of_month,
-            "Dolar": transform_to_first_day_of_month,
+    def get_page_table_identifiers(self):
+        """Identificadores das tabelas usadas em cada página (url -> lista de identificadores)"""
+        return {
+            self.params[key].get("url"): [self.TABLE_IDENTIFIERS]
+            for key in self.params.keys()
         }
 
-        for key in self.params.keys():
-            url = self.params[key].get("url")
-            self.fetch_page_content(url)
-
-            if self.soup:
-                table = self.soup.find("div", class_="table-content").find(
-                    "table", class_="cot-fisicas"
-                )
-                if table:
-                    df = pd.read_html(str(table), decimal=",", thousands=".")[0]
-
-                    df.columns = ["Mês", "Valor", "Variacao"]
-                    df = df[["Mês", "Valor"]]
-
-                    transform_date = transform_date_params.get(key, None)
+    def historical_url(self, key, day):
+        """Página da cotação de uma série em uma data passada"""
+        return f"{self.params[key].get('url')}/{day.isoformat()}"
+
+    def extract_table_data(self, table):
+        """Lê Mês e Valor direto das células da tabela já parseada"""
+        body = table.find("tbody") or table
+        rows = [
+            [cell.get_text(strip=True) for cell in tr.find_all("td")]
+            for tr in body.find_all("tr")
+        ]
+        return self.rows_to_frame(rows)
+
+    def rows_to_frame(self, rows):
+        """Monta Mês e Valor a partir das duas primeiras células de cada linha"""
+        return pd.DataFrame(
+            [row[:2] for row in rows if len(row) >= 2], columns=["Mês", "Valor"]
+        )
 
-                    if transform_date:
-                        df["Mês"] = df["Mês"].apply(transform_date)
-
-                    if key == "Dolar":
-                        df["Valor"] = df["Valor"].apply(lambda x: float(x) / 1000)
-
-                    df["Valor"] = df["Valor"].apply(format_currency)
+    def execute(self) -> dict:
+        pages = self.fetch_pages(
+            [self.params[key].get("url") for key in self.params.keys()],
+            parse_only=self.get_page_table_identifiers(),
+        )
 
-                    file = self.save_dataframe_to_csv(
-                        df, self.params[key].get("file_name")
-                    )
-                    self.scrapes[key] = {"df": df, "file": file}
-                else:
-                    print("Table not found")
+        for key in self.params.keys():
+            url = self.params[key].get("url")
+            soup = pages.get(url)
+            if not soup:
+                print(f"Page not found {url}")
+                self.serve_stale(key)
+                continue
+
+            table = self.select_tables(url, soup, self.TABLE_SELECTOR).get("cotacao")
+            if not table:
+                self.serve_stale(key)
+                continue
+
+            digest = self.table_digest(table)
+            entry = self.lookup_unchanged(key, digest)
+            if entry:
+                df = entry["value"]
+            else:
+                with self.stage("extract", url=url, table=key):
+                    df = self.extract_table_data(table)
+
+                with self.stage("transform", table=key):
+                    df = self.transform(key, df)
+            self.metrics.record_rows(key, len(df))
+
+            file = self.save_unless_current(
+                df, self.params[key].get("file_name"), entry
+            )
+            if not (entry and file.done()):
+                store = self.get_history_store()
+                if store:
+                    store.upsert_series(date.today(), key, df)
+            self.remember_table(key, digest, df, file, entry)
+            self.scrapes[key] = {"df": df, "file": file}
 
         for key, value in self.scrapes.items():
             self.data_frames[key] = value.get("df", None)
 
         return self.data_frames
+
+    def serve_stale(self, key):
+        """Usa o último resultado bom da série quando a página falha ou estoura o prazo"""
+        entry = self.last_good(key)
+        if entry:
+            self.metrics.record_stale(key)
+            self.scrapes[key] = {"df": entry["value"], "file": None}
+
+    def transform(self, key, df):
+        """Converte Mês em data e Valor em número (com escala)"""
+        month_anchor = self.params[key].get("month_anchor")
+        if month_anchor:
+            df["Mês"] = parse_ptbr_month_year(df["Mês"], anchor=month_anchor)
+
+        values = parse_ptbr_number(df["Valor"])
+        divisor = self.params[key].get("divisor")
+        if divisor:
+            values = values / divisor
+
+        df["Valor"] = values
+        return df
@@ -0,0 +1,201 @@
+"""Carga histórica em paralelo do indicador CEPEA e das séries B3.
+
+Uso: python -m scrape.backfill [cepea] [b3] [--start 2026-01-01] [--end 2026-06-30]
+                               [--workers 4] [--rate 2] [--output-dir output]
+
+O indicador CEPEA é lido por inteiro (todas as linhas da tabela) e as séries B3 são
+buscadas dia a dia nas páginas datadas. As páginas são baixadas e lidas em um pool de
+processos, com um intervalo mínimo entre requisições ao mesmo host compartilhado por
+todos os processos. Cada processo lê as tabelas em streaming e grava no histórico
+SQLite (indicators e series) em blocos de tamanho fixo.
+"""
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+from scrape.streaming import chunked
+
+SOURCES = ("cepea", "b3")
+DEFAULT_DAYS = 90
+DEFAULT_RATE = 2.0
+
+
+class HostRateLimiter:
+    """Intervalo mínimo entre requisições ao mesmo host, compartilhado entre processos"""
+
+    def __init__(self, hosts, rate=DEFAULT_RATE):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._slots = {
+            host: (multiprocessing.Lock(), multiprocessing.Value("d", 0.0, lock=False))
+            for host in hosts
+        }
+
+    def wait(self, url):
+        """Reserva o próximo horário livre do host e dorme até ele"""
+        slot = self._slots.get(urlsplit(url).netloc)
+        if not slot or not self.interval:
+            return
+
+        lock, next_at = slot
+        with lock:
+            now = time.time()
+            start = max(now, next_at.value)
+            next_at.value = start + self.interval
+        time.sleep(max(0.0, start - now))
+
+
+_limiter = None
+_scrapers = {}
+
+
+def business_days(start, end):
+    """Dias úteis (segunda a sexta) entre start e end, inclusive"""
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+
+def build_tasks(sources, start, end):
+    """Lista de (fonte, série, data, url) a buscar"""
+    tasks = []
+    if "cepea" in sources:
+        from scrape.scoot_cepea import ScootCepeaScrape
+
+        tasks.append(("cepea", ScootCepeaScrape.CEPEA_INDICATOR, None, ScootCepeaScrape.CEPEA_URL))
+
+    if "b3" in sources:
+        scraper = _get_scraper("b3")
+        for day in business_days(start, end):
+            for key in scraper.params:
+                tasks.append(("b3", key, day, scraper.historical_url(key, day)))
+
+    return tasks
+
+
+def run_task(task):
+    """Lê uma página no processo do pool e grava no histórico em blocos; retorna (tarefa, linhas)
+
+    As linhas chegam de um parser incremental e são gravadas a cada STREAM_CHUNK_ROWS,
+    sem manter o documento nem a tabela inteira em memória.
+    """
+    source, key, day, url = task
+    scraper = _get_scraper(source)
+    store = scraper.get_history_store()
+    identifiers = scraper.CEPEA_TABLE_IDENTIFIERS if source == "cepea" else scraper.TABLE_IDENTIFIERS
+
+    _wait_for_host(scraper, url)
+    rows = scraper.stream_table_rows(url, [identifiers])
+    count = 0
+    headers = []
+    for chunk in chunked(rows, scraper.STREAM_CHUNK_ROWS):
+        headers = headers or next((row.cells for row in chunk if row.header), [])
+        cells = [row.cells for row in chunk if not row.header]
+        if source == "cepea":
+            df = scraper.cepea_frame(headers, cells)
+            store.upsert_indicator(key, df)
+        else:
+            df = scraper.transform(key, scraper.rows_to_frame(cells))
+            store.upsert_series(day, key, df)
+        count += len(df)
+
+    return task, count
+
+
+def backfill(sources, start, end, workers=None, rate=DEFAULT_RATE, output_dir=None):
+    """Executa a carga histórica e retorna {série: linhas gravadas}"""
+    from scrape.base import ScrapeBase
+    from scrape.cli import configure_output
+
+    configure_output(output_dir)
+    # cria o esquema antes do pool; os processos só fazem upserts
+    ScrapeBase.get_history_store()
+    tasks = build_tasks(sources, start, end)
+    if not tasks:
+        return {}
+
+    limiter = HostRateLimiter({urlsplit(task[3]).netloc for task in tasks}, rate)
+    counts = {}
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(limiter, output_dir)
+    ) as executor:
+        futures = [executor.submit(run_task, task) for task in tasks]
+        for future in as_completed(futures):
+            try:
+                (_source, key, _day, url), count = future.result()
+            except Exception as error:
+                print(f"Fail to backfill: {error}")
+                continue
+
+            if not count:
+                print(f"Table not found {url}")
+                continue
+
+            counts[key] = counts.get(key, 0) + count
+
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m scrape.backfill", description=__doc__.splitlines()[0])
+    parser.add_argument("sources", nargs="*", metavar="source",
+                        help=f"fontes a carregar ({', '.join(SOURCES)}); padrão: todas")
+    parser.add_argument("--start", type=date.fromisoformat,
+                        help=f"primeiro dia (AAAA-MM-DD); padrão: {DEFAULT_DAYS} dias atrás")
+    parser.add_argument("--end", type=date.fromisoformat, help="último dia (AAAA-MM-DD); padrão: hoje")
+    parser.add_argument("--workers", type=int, help="processos do pool; padrão: número de CPUs")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help="requisições por segundo por host (0 desliga o limite)")
+    parser.add_argument("--output-dir", help="diretório do histórico")
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.sources) - set(SOURCES))
+    if unknown:
+        parser.error(f"invalid source: {', '.join(unknown)} (choose from {', '.join(SOURCES)})")
+
+    end = args.end or date.today()
+    start = args.start or end - timedelta(days=DEFAULT_DAYS)
+    started = time.perf_counter()
+    counts = backfill(args.sources or list(SOURCES), start, end, args.workers, args.rate, args.output_dir)
+
+    for key, count in sorted(counts.items()):
+        print(f"{key}: {count} rows")
+    print(f"backfill: {time.perf_counter() - started:.1f} s")
+    return 0 if counts else 1
+
+
+def _init_worker(limiter, output_dir):
+    global _limiter
+    _limiter = limiter
+    if output_dir:
+        from scrape.cli import configure_output
+
+        configure_output(output_dir)
+
+
+def _get_scraper(source):
+    if source not in _scrapers:
+        if source == "cepea":
+            from scrape.scoot_cepea import ScootCepeaScrape
+
+            _scrapers[source] = ScootCepeaScrape(sources=["cepea"])
+        else:
+            from scrape.b3 import B3Scrape
+
+            _scrapers[source] = B3Scrape()
+    return _scrapers[source]
+
+
+def _wait_for_host(scraper, url):
+    """Respeita o limite do host só quando a página não está fresca no cache"""
+    cache = scraper.get_cache()
+    entry = cache.lookup(url) if cache else None
+    if _limiter and not (entry and cache.is_fresh(entry)):
+        _limiter.wait(url)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,19 +1,93 @@
+import atexit
+import functools
+import hashlib
+import os
 import re
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import timedelta, datetime
+from urllib.parse import urlsplit
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from scrape.cache import ResponseCache
+from scrape.circuit import CircuitBreaker
+from scrape.changes import TableChangeTracker
+from scrape.metrics import ScrapeMetrics, logger as metrics_logger, write_prometheus_snapshot
+from scrape.singleflight import SingleFlight, file_lease
+from scrape.store import HistoryStore
+from scrape.streaming import iter_table_rows
+from scrape.writer import OutputWriter
 
 class ScrapeBase:
     SATURDAY_WEEK_DAY = 5
     TWO_GROUPS_EXPRESSION = r"^(\w{2})\s(.+)$"
     OUTPUT_CSV_DIR = "output"
+    OUTPUT_COMPRESSION = None
+    OUTPUT_QUEUE_SIZE = 64
+    DISPLAY_DECIMALS = 2
     HEADER_DEFAULT = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
     }
+    HTML_PARSER = "lxml"
+    PARTIAL_PARSING = True
+    MAX_WORKERS = 8
+    MAX_WORKERS_PER_HOST = 3
+    CONNECT_TIMEOUT = 5
+    READ_TIMEOUT = 20
+    MAX_RETRIES = 3
+    RETRY_BACKOFF_FACTOR = 0.5
+    RETRY_BACKOFF_JITTER = 0.5
+    RETRY_STATUS_FORCELIST = (429, 500, 502, 503, 504)
+    CACHE_DIR = ".cache/http"
+    CACHE_TTL = 15 * 60
+    CACHE_MAX_BYTES = 50 * 1024 * 1024
+    CACHE_MAX_AGE = 7 * 24 * 60 * 60
+    HISTORY_DB = f"{OUTPUT_CSV_DIR}/history.sqlite3"
+    METRICS_FILE = os.environ.get("SCRAPE_METRICS_FILE")
+    CHANGES_DIR = ".cache/tables"
+    SOURCE_DEADLINE = float(os.environ.get("SCRAPE_SOURCE_DEADLINE", 30))
+    SOURCE_DEADLINES = {}
+    CIRCUIT_FAILURES = 3
+    CIRCUIT_COOLDOWN = 5 * 60
+    LOCK_DIR = ".cache/locks"
+    EXECUTE_LEASE_TIMEOUT = 120
+    PROFILE_DIR = os.environ.get("SCRAPE_PROFILE_DIR") or (
+        "profiles" if os.environ.get("SCRAPE_PROFILE") else None
+    )
+    PROFILE_TOP = 25
+    # muda quando o formato dos quadros muda, invalidando os resultados guardados
+    SCHEMA_VERSION = 2
+    STREAM_READ_BYTES = 64 * 1024
+    STREAM_CHUNK_ROWS = 500
+
+    _session = None
+    _session_lock = threading.Lock()
+    _caches = {}
+    _stores = {}
+    _writers = {}
+    _trackers = {}
+    _circuits = {}
+    _host_semaphores = {}
+    _flights = SingleFlight()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "execute" in cls.__dict__:
+            cls.execute = _instrument_execute(cls.__dict__["execute"])
 
     def __init__(self):
-        self.soup = None
+        self.metrics = ScrapeMetrics(type(self).__name__)
+        self._profiler = None
+
+    def stage(self, name, url=None, table=None):
+        """Context manager que mede uma etapa na execução corrente"""
+        return self.metrics.stage(name, url=url, table=table)
 
     def get_previous_weekday(self, date):
         """Retorna o dia útil anterior à data fornecida."""
@@ -32,21 +106,512 @@ class ScrapeBase:
 
         return text.split()
 
-    def save_dataframe_to_csv(self, df, filename):
-        """Salva um DataFrame em um arquivo CSV."""
+    def output_path(self, filename):
+        """Caminho do CSV do dia para o arquivo informado"""
         current_time = datetime.now().strftime("%Y-%m-%d")
-        save_file_name = f"{self.OUTPUT_CSV_DIR}/{current_time}-{filename}"
-        df.to_csv(save_file_name, index=False)
-        return save_file_name
+        return f"{self.OUTPUT_CSV_DIR}/{current_time}-{filename}"
+
+    def save_dataframe_to_csv(self, df, filename):
+        """Envia o DataFrame para gravação em CSV em segundo plano; retorna um Future com o caminho"""
+        return self.get_writer().submit(
+            df,
+            self.output_path(filename),
+            metrics=self.metrics,
+            decimals=self.DISPLAY_DECIMALS,
+        )
+
+    @staticmethod
+    def table_digest(table):
+        """Hash sha256 do HTML da tabela"""
+        return hashlib.sha256(str(table).encode("utf-8")).hexdigest()
+
+    def lookup_unchanged(self, name, digest):
+        """Entrada da execução anterior se o HTML da tabela não mudou; registra no relatório de mudanças"""
+        tracker = self.get_change_tracker()
+        entry = None
+        if tracker and digest:
+            entry = tracker.lookup(self._table_key(name), digest)
+
+        self.metrics.record_change(name, entry is None)
+        return entry
+
+    def remember_table(self, name, digest, value, file, entry=None):
+        """Guarda o resultado calculado para a tabela assim que o CSV estiver gravado"""
+        tracker = self.get_change_tracker()
+        if not tracker or not digest:
+            return
+
+        if entry and file.done() and file.result() == entry.get("file"):
+            return
+
+        key = self._table_key(name)
+
+        def update(future):
+            if future.exception() is None:
+                tracker.update(key, digest, value, future.result())
+
+        file.add_done_callback(update)
+
+    def last_good(self, name):
+        """Último resultado guardado para a tabela, qualquer que seja o hash (ou None)"""
+        tracker = self.get_change_tracker()
+        return tracker.get(self._table_key(name)) if tracker else None
+
+    def _table_key(self, name):
+        return f"{type(self).__name__}:v{self.SCHEMA_VERSION}:{name}"
+
+    def save_unless_current(self, df, filename, entry=None):
+        """Grava o CSV, exceto se o arquivo do dia já foi gravado a partir da mesma tabela"""
+        path = self.output_path(filename)
+        if entry and entry.get("file") in (path, f"{path}.gz") and os.path.exists(entry["file"]):
+            future = Future()
+            future.set_result(entry["file"])
+            return future
+
+        return self.save_dataframe_to_csv(df, filename)
+
+    def change_report(self):
+        """Tabelas que mudaram e que ficaram iguais na última execução"""
+        changes = self.metrics.changes
+        return {
+            "changed": [table for table, changed in changes.items() if changed],
+            "unchanged": [table for table, changed in changes.items() if not changed],
+        }
+
+    def fetch_page_content(self, url, headers=None, table_identifiers=None):
+        """Faz a requisição HTTP para obter o conteúdo da página e retorna o BeautifulSoup
+
+        Chamadas simultâneas para a mesma página (de qualquer scraper ou sessão do
+        processo) compartilham um único download e parse.
+        """
+        key = ("page", url, repr(headers), repr(table_identifiers))
+        return ScrapeBase._flights.do(
+            key, lambda: self._fetch_page_content(url, headers, table_identifiers)
+        )
 
-    def fetch_page_content(self, url, headers=None):
-        """Faz a requisição HTTP para obter o conteúdo da página e retorna o BeautifulSoup"""
+    def _fetch_page_content(self, url, headers=None, table_identifiers=None):
+        content = self.download(url, headers)
+        if content is None:
+            return None
+
+        with self.stage("parse", url=url):
+            return self.parse_page(content, table_identifiers)
+
+    def stream_table_rows(self, url, table_identifiers, headers=None):
+        """Entrega as linhas das tabelas da página sem montar o documento inteiro
+
+        Os blocos de stream_page vão direto para um parser incremental; a árvore é
+        descartada conforme as linhas são consumidas.
+        """
+        yield from iter_table_rows(self.stream_page(url, headers), table_identifiers)
+
+    def stream_page(self, url, headers=None):
+        """Corpo da página em blocos de STREAM_READ_BYTES, sem montá-lo inteiro em memória
+
+        Uma cópia fresca do cache é lida do disco em blocos; senão a resposta é pedida com
+        stream=True e gravada no cache conforme é consumida.
+        """
+        start = time.perf_counter()
+        outcome = {"status": None, "source": "error", "size": 0}
+        try:
+            for block in self._stream_page(url, headers or self.HEADER_DEFAULT, outcome):
+                outcome["size"] += len(block)
+                yield block
+        finally:
+            self.metrics.record_request(
+                url,
+                outcome["status"],
+                outcome["size"],
+                time.perf_counter() - start,
+                outcome["source"],
+            )
+
+    def _stream_page(self, url, headers, outcome):
+        cache = self.get_cache()
+        entry = cache.lookup(url) if cache else None
+        if entry and cache.is_fresh(entry):
+            outcome.update(status=200, source="cache")
+            yield from cache.iter_read(entry, self.STREAM_READ_BYTES)
+            return
+
+        circuit = self.get_circuit(url)
+        if not circuit.allow():
+            print(f"Circuit open for {urlsplit(url).netloc}, skipping {url}")
+            outcome["source"] = "circuit-open"
+            return
+
+        request_headers = dict(headers)
+        if entry:
+            request_headers.update(cache.conditional_headers(entry))
+
+        with self._host_semaphore(url):
+            try:
+                response = self.get_session().get(
+                    url,
+                    headers=request_headers,
+                    timeout=(self.CONNECT_TIMEOUT, self.READ_TIMEOUT),
+                    stream=True,
+                )
+            except requests.RequestException as error:
+                circuit.failure()
+                print(f"Fail to process page {url}: {error}")
+                return
+
+            with response:
+                outcome.update(status=response.status_code, source="network")
+                if response.status_code == 304 and entry:
+                    circuit.success()
+                    cache.refresh(entry, response.headers)
+                    outcome["source"] = "revalidated"
+                    yield from cache.iter_read(entry, self.STREAM_READ_BYTES)
+                    return
+
+                if response.status_code != 200:
+                    if response.status_code in self.RETRY_STATUS_FORCELIST:
+                        circuit.failure()
+                    print(f"Fail to process page {url}: {response.status_code}")
+                    return
+
+                circuit.success()
+                blocks = response.iter_content(self.STREAM_READ_BYTES)
+                yield from cache.tee(url, blocks, response.headers) if cache else blocks
+
+    def parse_page(self, content, table_identifiers=None):
+        """Monta o BeautifulSoup da página; com PARTIAL_PARSING só as tabelas declaradas"""
+        parse_only = None
+        if self.PARTIAL_PARSING and table_identifiers:
+            parse_only = self.build_table_strainer(table_identifiers)
+
+        return BeautifulSoup(content, self.HTML_PARSER, parse_only=parse_only)
+
+    def select_tables(self, url, soup, selector):
+        """Escolhe as tabelas do seletor em uma passada pela página e avisa das que faltam,
+        das ambíguas e das que casam com mais de um identificador"""
+        with self.stage("select", url=url):
+            selection = selector.select(soup)
+        for problem in selection.problems():
+            print(f"{problem} ({url})" if url else problem)
+        return selection
+
+    @staticmethod
+    def build_table_strainer(table_identifiers):
+        """SoupStrainer que aceita qualquer tabela que satisfaça um dos identificadores"""
+        common_keys = set(table_identifiers[0])
+        for identifiers in table_identifiers[1:]:
+            common_keys &= set(identifiers)
+
+        attrs = {
+            key: list(dict.fromkeys(identifiers[key] for identifiers in table_identifiers))
+            for key in common_keys
+        }
+        return SoupStrainer("table", attrs=attrs)
+
+    def download(self, url, headers=None):
+        """Baixa o corpo da página, usando o cache em disco com revalidação condicional"""
+        start = time.perf_counter()
+        content, status, source = self._download(url, headers)
+        self.metrics.record_request(
+            url,
+            status,
+            len(content) if content is not None else 0,
+            time.perf_counter() - start,
+            source,
+        )
+        return content
+
+    def _download(self, url, headers=None):
         if headers is None:
             headers = self.HEADER_DEFAULT
 
-        response = requests.get(url, headers=headers)
+        if not self.get_cache():
+            return self._request(url, headers)
+
+        content = self._read_fresh(url)
+        if content is not None:
+            return content, 200, "cache"
+
+        # Outro processo pode estar baixando a mesma página: espera por ele e relê o cache
+        with self.lease(f"download:{url}", timeout=self.source_deadline(url)):
+            content = self._read_fresh(url)
+            if content is not None:
+                return content, 200, "cache"
+            return self._request(url, headers)
+
+    def _read_fresh(self, url):
+        cache = self.get_cache()
+        entry = cache.lookup(url) if cache else None
+        if entry and cache.is_fresh(entry):
+            return cache.read(entry)
+        return None
+
+    def _request(self, url, headers):
+        cache = self.get_cache()
+        entry = cache.lookup(url) if cache else None
+        circuit = self.get_circuit(url)
+        if not circuit.allow():
+            print(f"Circuit open for {urlsplit(url).netloc}, skipping {url}")
+            return None, None, "circuit-open"
+
+        request_headers = dict(headers)
+        if entry:
+            request_headers.update(cache.conditional_headers(entry))
+
+        try:
+            with self._host_semaphore(url):
+                response = self.get_session().get(
+                    url,
+                    headers=request_headers,
+                    timeout=(self.CONNECT_TIMEOUT, self.READ_TIMEOUT),
+                )
+        except requests.RequestException as error:
+            circuit.failure()
+            print(f"Fail to process page {url}: {error}")
+            return None, None, "error"
+
+        if response.status_code == 304 and entry:
+            content = cache.read(entry)
+            if content is not None:
+                circuit.success()
+                cache.refresh(entry, response.headers)
+                return content, 304, "revalidated"
+
         if response.status_code == 200:
-            self.soup = BeautifulSoup(response.content, "html.parser")
-        else:
-            self.soup = None
-            print(f"Fail to process page {url}: {response.status_code}")
+            circuit.success()
+            if cache:
+                cache.store(url, response.content, response.headers)
+            return response.content, 200, "network"
+
+        if response.status_code in self.RETRY_STATUS_FORCELIST:
+            circuit.failure()
+        print(f"Fail to process page {url}: {response.status_code}")
+        return None, response.status_code, "network"
+
+    def fetch_pages(self, urls, headers=None, parse_only=None):
+        """Busca várias páginas em paralelo e retorna um dicionário url -> BeautifulSoup
+
+        parse_only mapeia url -> lista de identificadores das tabelas usadas na página.
+        """
+        return dict(self.iter_pages(urls, headers, parse_only))
+
+    def iter_pages(self, urls, headers=None, parse_only=None):
+        """Busca várias páginas em paralelo e entrega (url, BeautifulSoup) na ordem em que ficam prontas
+
+        Páginas que não ficam prontas dentro do prazo da fonte (source_deadline) saem
+        como (url, None) e contam como falha no circuito do host; o download segue em
+        segundo plano sem bloquear a execução.
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return
+
+        parse_only = parse_only or {}
+        started = time.monotonic()
+        deadlines = {url: started + self.source_deadline(url) for url in urls}
+        executor = ThreadPoolExecutor(max_workers=min(self.MAX_WORKERS, len(urls)))
+        try:
+            fetch = self.fetch_page_content
+            if self._profiler:
+                fetch = self._profiler.wrap(fetch)
+            pending = {
+                executor.submit(fetch, url, headers, parse_only.get(url)): url
+                for url in urls
+            }
+            while pending:
+                timeout = min(deadlines[url] for url in pending.values()) - time.monotonic()
+                done, _ = wait(pending, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+
+                now = time.monotonic()
+                for future, url in list(pending.items()):
+                    if deadlines[url] <= now:
+                        del pending[future]
+                        future.cancel()
+                        self.get_circuit(url).failure()
+                        self.metrics.record_request(url, None, 0, now - started, "deadline")
+                        print(f"Deadline exceeded for {url}")
+                        yield url, None
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def execution_key(self):
+        """Identifica execuções equivalentes, que podem compartilhar o mesmo resultado"""
+        return type(self).__name__
+
+    def lease(self, name, timeout=None):
+        """Lock entre processos para name em LOCK_DIR (sem LOCK_DIR, não faz nada)"""
+        if not self.LOCK_DIR:
+            return nullcontext(False)
+
+        digest = hashlib.sha256(name.encode("utf-8")).hexdigest()
+        return file_lease(os.path.join(self.LOCK_DIR, f"{digest}.lock"), timeout)
+
+    def source_deadline(self, url):
+        """Prazo em segundos para a página de uma fonte (SOURCE_DEADLINES por host)"""
+        return self.SOURCE_DEADLINES.get(urlsplit(url).netloc, self.SOURCE_DEADLINE)
+
+    @classmethod
+    def get_session(cls):
+        """Retorna a sessão HTTP compartilhada por todos os scrapers (keep-alive e retry)"""
+        with ScrapeBase._session_lock:
+            if ScrapeBase._session is None:
+                ScrapeBase._session = cls.build_session()
+            return ScrapeBase._session
+
+    @classmethod
+    def get_cache(cls):
+        """Retorna o cache de respostas em disco configurado para a classe (ou None)"""
+        if not cls.CACHE_DIR:
+            return None
+
+        with ScrapeBase._session_lock:
+            if cls.CACHE_DIR not in ScrapeBase._caches:
+                ScrapeBase._caches[cls.CACHE_DIR] = ResponseCache(
+                    cls.CACHE_DIR,
+                    ttl=cls.CACHE_TTL,
+                    max_bytes=cls.CACHE_MAX_BYTES,
+                    max_age=cls.CACHE_MAX_AGE,
+                )
+            return ScrapeBase._caches[cls.CACHE_DIR]
+
+    @classmethod
+    def get_history_store(cls):
+        """Retorna o histórico em SQLite configurado para a classe (ou None)"""
+        if not cls.HISTORY_DB:
+            return None
+
+        with ScrapeBase._session_lock:
+            if cls.HISTORY_DB not in ScrapeBase._stores:
+                ScrapeBase._stores[cls.HISTORY_DB] = HistoryStore(cls.HISTORY_DB)
+            return ScrapeBase._stores[cls.HISTORY_DB]
+
+    @classmethod
+    def get_change_tracker(cls):
+        """Retorna o rastreador de mudanças das tabelas (ou None)"""
+        if not cls.CHANGES_DIR:
+            return None
+
+        with ScrapeBase._session_lock:
+            if cls.CHANGES_DIR not in ScrapeBase._trackers:
+                ScrapeBase._trackers[cls.CHANGES_DIR] = TableChangeTracker(cls.CHANGES_DIR)
+            return ScrapeBase._trackers[cls.CHANGES_DIR]
+
+    @classmethod
+    def get_circuit(cls, url):
+        """Circuit breaker compartilhado do host da url"""
+        host = urlsplit(url).netloc
+        with ScrapeBase._session_lock:
+            if host not in ScrapeBase._circuits:
+                ScrapeBase._circuits[host] = CircuitBreaker(
+                    failures=cls.CIRCUIT_FAILURES, cooldown=cls.CIRCUIT_COOLDOWN
+                )
+            return ScrapeBase._circuits[host]
+
+    @classmethod
+    def get_writer(cls):
+        """Retorna o writer assíncrono compartilhado para a compressão configurada"""
+        with ScrapeBase._session_lock:
+            if cls.OUTPUT_COMPRESSION not in ScrapeBase._writers:
+                writer = OutputWriter(
+                    max_queue=cls.OUTPUT_QUEUE_SIZE, compression=cls.OUTPUT_COMPRESSION
+                )
+                atexit.register(writer.flush)
+                ScrapeBase._writers[cls.OUTPUT_COMPRESSION] = writer
+            return ScrapeBase._writers[cls.OUTPUT_COMPRESSION]
+
+    @classmethod
+    def build_session(cls):
+        """Cria a sessão HTTP com pool de conexões, retry com backoff e compressão"""
+        retry = Retry(
+            total=cls.MAX_RETRIES,
+            backoff_factor=cls.RETRY_BACKOFF_FACTOR,
+            backoff_jitter=cls.RETRY_BACKOFF_JITTER,
+            status_forcelist=cls.RETRY_STATUS_FORCELIST,
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=cls.MAX_WORKERS,
+            pool_maxsize=cls.MAX_WORKERS,
+            max_retries=retry,
+        )
+
+        session = requests.Session()
+        session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _host_semaphore(self, url):
+        """Limita o número de requisições simultâneas para o mesmo host, somando todas as
+        instâncias do processo"""
+        host = urlsplit(url).netloc
+        with ScrapeBase._session_lock:
+            if host not in ScrapeBase._host_semaphores:
+                ScrapeBase._host_semaphores[host] = threading.BoundedSemaphore(
+                    self.MAX_WORKERS_PER_HOST
+                )
+            return ScrapeBase._host_semaphores[host]
+
+
+# execute() em andamento na thread corrente: id do scraper -> profundidade de aninhamento
+_executions = threading.local()
+
+
+def _execution_depths():
+    if not hasattr(_executions, "depths"):
+        _executions.depths = {}
+    return _executions.depths
+
+
+def _profile_run(scraper):
+    """Perfil de CPU/alocação da execução quando PROFILE_DIR está ligado; senão não faz nada"""
+    if not scraper.PROFILE_DIR:
+        return nullcontext()
+
+    from scrape.profiling import RunProfiler
+
+    scraper._profiler = RunProfiler(
+        scraper.PROFILE_DIR, type(scraper).__name__, top=scraper.PROFILE_TOP
+    )
+    return scraper._profiler
+
+
+def _instrument_execute(execute):
+    """Envolve o execute() de cada subclasse para coletar e publicar as métricas da execução"""
+
+    def run(self, key, *args, **kwargs):
+        depths = _execution_depths()
+        depths[id(self)] = depths.get(id(self), 0) + 1
+        self.metrics = ScrapeMetrics(type(self).__name__)
+        try:
+            # Em outro processo a mesma execução espera esta terminar e depois acha as
+            # páginas frescas no cache, sem repetir os downloads
+            with self.lease(f"execute:{key}", timeout=self.EXECUTE_LEASE_TIMEOUT):
+                with self.stage("execute"), _profile_run(self):
+                    return execute(self, *args, **kwargs), self.metrics
+        finally:
+            depths[id(self)] -= 1
+            if not depths[id(self)]:
+                del depths[id(self)]
+            self._profiler = None
+            self.metrics.finish()
+            if self.metrics.changes:
+                metrics_logger.debug("%s changes: %s", type(self).__name__, self.change_report())
+            if self.METRICS_FILE:
+                write_prometheus_snapshot(self.METRICS_FILE)
+
+    @functools.wraps(execute)
+    def wrapper(self, *args, **kwargs):
+        # execute() chamado de dentro de outro execute() do mesmo scraper, na mesma thread
+        if _execution_depths().get(id(self)):
+            return execute(self, *args, **kwargs)
+
+        # Execuções simultâneas equivalentes no processo compartilham o mesmo resultado
+        key = self.execution_key()
+        result, self.metrics = ScrapeBase._flights.do(
+            ("execute", key), lambda: run(self, key, *args, **kwargs)
+        )
+        return result
+
+    return wrapper
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class ResponseCache:
+    """Cache HTTP persistente em disco, com corpo endereçado pelo conteúdo (sha256)"""
+
+    INDEX_DIR = "index"
+    OBJECTS_DIR = "objects"
+
+    def __init__(self, directory, ttl=900, max_bytes=50 * 1024 * 1024, max_age=7 * 86400):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.RLock()
+
+        os.makedirs(os.path.join(directory, self.INDEX_DIR), exist_ok=True)
+        os.makedirs(os.path.join(directory, self.OBJECTS_DIR), exist_ok=True)
+
+    def lookup(self, url):
+        """Retorna a entrada do índice para a url, ou None se não houver cópia local"""
+        try:
+            with open(self._index_path(url), encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("url") != url or not os.path.exists(self._object_path(entry["digest"])):
+            return None
+
+        return entry
+
+    def is_fresh(self, entry):
+        """Indica se a entrada ainda está dentro do TTL e pode ser usada sem revalidar"""
+        return time.time() - entry["stored_at"] < self.ttl
+
+    def read(self, entry):
+        """Lê o corpo armazenado para a entrada, ou None se ele já foi removido"""
+        try:
+            with open(self._object_path(entry["digest"]), "rb") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def iter_read(self, entry, size):
+        """Lê o corpo armazenado em blocos de size bytes (nada se ele já foi removido)"""
+        try:
+            file = open(self._object_path(entry["digest"]), "rb")
+        except OSError:
+            return
+        with file:
+            while block := file.read(size):
+                yield block
+
+    def conditional_headers(self, entry):
+        """Cabeçalhos de revalidação (If-None-Match / If-Modified-Since) para a entrada"""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, content, headers):
+        """Armazena o corpo de uma resposta 200 e atualiza o índice da url"""
+        entry = self._new_entry(url, hashlib.sha256(content).hexdigest(), len(content), headers)
+
+        with self._lock:
+            object_path = self._object_path(entry["digest"])
+            if not os.path.exists(object_path):
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                self._write_atomic(object_path, content)
+
+            self._write_entry(entry)
+            self.evict()
+
+        return entry
+
+    def tee(self, url, blocks, headers):
+        """Repassa os blocos de uma resposta 200 e os armazena conforme passam
+
+        O corpo vai para um arquivo temporário e só entra no cache quando a resposta é
+        lida até o fim; sem montar o corpo inteiro em memória.
+        """
+        fd, temp_path = tempfile.mkstemp(dir=os.path.join(self.directory, self.OBJECTS_DIR), prefix=".tmp-")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for block in blocks:
+                    file.write(block)
+                    digest.update(block)
+                    size += len(block)
+                    yield block
+        except BaseException:
+            self._remove(temp_path)
+            raise
+
+        entry = self._new_entry(url, digest.hexdigest(), size, headers)
+        with self._lock:
+            object_path = self._object_path(entry["digest"])
+            if os.path.exists(object_path):
+                self._remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                os.replace(temp_path, object_path)
+
+            self._write_entry(entry)
+            self.evict()
+
+    def refresh(self, entry, headers):
+        """Renova a entrada após uma resposta 304 Not Modified"""
+        entry = dict(entry, stored_at=time.time())
+        entry["etag"] = headers.get("ETag", entry.get("etag"))
+        entry["last_modified"] = headers.get("Last-Modified", entry.get("last_modified"))
+        self._write_entry(entry)
+        return entry
+
+    def evict(self):
+        """Remove entradas mais antigas que max_age e as menos recentes até caber em max_bytes"""
+        with self._lock:
+            entries = []
+            index_dir = os.path.join(self.directory, self.INDEX_DIR)
+            for name in os.listdir(index_dir):
+                if name.startswith(".tmp-"):
+                    continue
+                path = os.path.join(index_dir, name)
+                try:
+                    with open(path, encoding="utf-8") as file:
+                        entries.append((path, json.load(file)))
+                except (OSError, ValueError):
+                    self._remove(path)
+
+            now = time.time()
+            kept = []
+            for path, entry in entries:
+                if now - entry.get("stored_at", 0) > self.max_age:
+                    self._remove(path)
+                else:
+                    kept.append((path, entry))
+
+            kept.sort(key=lambda item: item[1]["stored_at"], reverse=True)
+            total = 0
+            referenced = set()
+            for path, entry in kept:
+                if entry["digest"] not in referenced:
+                    total += entry.get("size", 0)
+                if total > self.max_bytes:
+                    self._remove(path)
+                else:
+                    referenced.add(entry["digest"])
+
+            objects_dir = os.path.join(self.directory, self.OBJECTS_DIR)
+            for root, _, files in os.walk(objects_dir):
+                for name in files:
+                    if name not in referenced and not name.startswith(".tmp-"):
+                        self._remove(os.path.join(root, name))
+
+    @staticmethod
+    def _new_entry(url, digest, size, headers):
+        return {
+            "url": url,
+            "digest": digest,
+            "size": size,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "stored_at": time.time(),
+        }
+
+    def _write_entry(self, entry):
+        content = json.dumps(entry).encode("utf-8")
+        self._write_atomic(self._index_path(entry["url"]), content)
+
+    def _write_atomic(self, path, content):
+        directory = os.path.dirname(path)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            self._remove(temp_path)
+            raise
+
+    def _index_path(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, self.INDEX_DIR, f"{key}.json")
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, self.OBJECTS_DIR, digest[:2], digest)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
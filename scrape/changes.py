@@ -0,0 +1,64 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+
+
+class TableChangeTracker:
+    """Guarda, por tabela, o hash do HTML de origem e o último resultado calculado a partir dele"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._entries = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def lookup(self, key, digest):
+        """Entrada anterior da tabela se o hash for o mesmo, senão None"""
+        entry = self.get(key)
+        if entry and entry["hash"] == digest:
+            return entry
+        return None
+
+    def get(self, key):
+        """Última entrada registrada para a tabela, qualquer que seja o hash"""
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = self._read(key)
+            return self._entries[key]
+
+    def update(self, key, digest, value, file=None):
+        entry = {"key": key, "hash": digest, "value": value, "file": file}
+        with self._lock:
+            self._entries[key] = entry
+            self._write(key, entry)
+        return entry
+
+    def _path(self, key):
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.pkl")
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), "rb") as file:
+                entry = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        return entry if entry.get("key") == key else None
+
+    def _write(self, key, entry):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+def digest_parts(parts):
+    """Hash combinado de vários hashes (ex.: as tabelas que compõem o Resumo)"""
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
@@ -0,0 +1,42 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """Abre depois de failures falhas seguidas e recusa chamadas por cooldown segundos
+
+    Passado o cooldown deixa uma tentativa passar; se ela falhar, volta a abrir.
+    """
+
+    def __init__(self, failures=3, cooldown=300):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._count = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None
+
+    def allow(self):
+        """True se a chamada pode seguir"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self._count = 0
+            self._opened_at = None
+
+    def failure(self):
+        with self._lock:
+            self._count += 1
+            if self._count >= self.failures:
+                self._opened_at = time.monotonic()
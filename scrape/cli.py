@@ -0,0 +1,102 @@
+"""Execução dos scrapers pela linha de comando, sem Streamlit.
+
+Uso: python -m scrape [scot] [cepea] [b3] [--output-dir output] [--gzip] [--startup-time]
+                      [--profile [profiles]]
+
+Sem argumentos executa todas as fontes. Os imports pesados (pandas, bs4, requests)
+só acontecem depois de interpretar os argumentos.
+"""
+import argparse
+import sys
+import time
+
+SOURCES = ("scot", "cepea", "b3")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m scrape", description=__doc__.splitlines()[0])
+    parser.add_argument("sources", nargs="*", metavar="source",
+                        help=f"fontes a executar ({', '.join(SOURCES)}); padrão: todas")
+    parser.add_argument("--output-dir", help="diretório dos CSVs e do histórico")
+    parser.add_argument("--gzip", action="store_true", help="grava os CSVs comprimidos")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="mostra o tempo de inicialização e de import dos scrapers")
+    parser.add_argument("--profile", nargs="?", const="profiles", metavar="DIR",
+                        help="grava perfil de CPU e de memória de cada execução em DIR (padrão: profiles)")
+    return parser
+
+
+def load_scrapers(sources):
+    """Importa só os scrapers necessários e retorna [(nome, fábrica)]"""
+    scrapers = []
+    scot_sources = [source for source in sources if source in ("scot", "cepea")]
+    if scot_sources:
+        from scrape.scoot_cepea import ScootCepeaScrape
+
+        scrapers.append(
+            ("ScootCepeaScrape", lambda: ScootCepeaScrape(sources=scot_sources))
+        )
+
+    if "b3" in sources:
+        from scrape.b3 import B3Scrape
+
+        scrapers.append(("B3Scrape", B3Scrape))
+
+    return scrapers
+
+
+def configure_output(output_dir=None, gzip=False):
+    """Aponta CSVs e histórico para output_dir e liga a compressão, se pedido"""
+    from scrape.base import ScrapeBase
+
+    if output_dir:
+        ScrapeBase.OUTPUT_CSV_DIR = output_dir
+        ScrapeBase.HISTORY_DB = f"{output_dir}/history.sqlite3"
+    if gzip:
+        ScrapeBase.OUTPUT_COMPRESSION = "gzip"
+
+
+def run(scrapers, output_dir=None, gzip=False, profile_dir=None):
+    """Executa os scrapers e retorna {nome do scraper: quadros}"""
+    from scrape.base import ScrapeBase
+
+    configure_output(output_dir, gzip)
+    if profile_dir:
+        ScrapeBase.PROFILE_DIR = profile_dir
+    results = {name: factory().execute() for name, factory in scrapers}
+
+    ScrapeBase.get_writer().flush()
+    return results
+
+
+def main(argv=None, started_at=None):
+    started_at = started_at or time.perf_counter()
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.sources) - set(SOURCES))
+    if unknown:
+        parser.error(f"invalid source: {', '.join(unknown)} (choose from {', '.join(SOURCES)})")
+    sources = args.sources or list(SOURCES)
+    cli_ready = time.perf_counter()
+
+    scrapers = load_scrapers(sources)
+    imported = time.perf_counter()
+
+    results = run(scrapers, output_dir=args.output_dir, gzip=args.gzip, profile_dir=args.profile)
+    finished = time.perf_counter()
+
+    empty = False
+    for scraper, frames in results.items():
+        for title, df in frames.items():
+            print(f"{scraper} {title}: {len(df)} rows")
+            empty = empty or df.empty
+        if not frames:
+            print(f"{scraper}: no data")
+            empty = True
+
+    if args.startup_time:
+        print(f"startup: {(cli_ready - started_at) * 1000:.1f} ms", file=sys.stderr)
+        print(f"imports: {(imported - cli_ready) * 1000:.1f} ms", file=sys.stderr)
+        print(f"scrape: {(finished - imported) * 1000:.1f} ms", file=sys.stderr)
+
+    return 1 if empty else 0
@@ -0,0 +1,72 @@
+"""Processo que executa os scrapers periodicamente e publica snapshots Arrow.
+
+Uso: python -m scrape.daemon [--interval 900] [--snapshot-dir snapshots] [--once]
+
+O dashboard (main.py) lê a versão mais recente por memory-map em vez de raspar.
+"""
+import argparse
+import time
+
+from scrape.cli import load_scrapers
+
+SNAPSHOT_DIR = "snapshots"
+SCRAPER_SOURCES = {"ScootCepeaScrape": "scot", "B3Scrape": "b3"}
+
+
+def run_once(scrapers, store):
+    """Executa todos os scrapers e publica o resultado como uma nova versão
+
+    A fonte cujo scraper falha segue na versão nova com os quadros da anterior, marcados
+    como desatualizados, para o dashboard não cair na raspagem própria. Se nenhum
+    scraper rodar, nada é publicado e a versão anterior envelhece.
+    """
+    results = {}
+    stale = {}
+    failed = []
+    for name, factory in scrapers:
+        source = SCRAPER_SOURCES[name]
+        try:
+            scraper = factory()
+            results[source] = scraper.execute()
+            stale[source] = scraper.metrics.stale
+        except Exception as error:
+            print(f"Fail to run {name}: {error}")
+            failed.append(source)
+
+    if not results:
+        return None
+
+    if failed:
+        previous, _ = store.load(sources=failed)
+        for source, frames in (previous or {}).items():
+            results[source] = frames
+            stale[source] = set(frames)
+
+    version = store.publish(results, stale=stale)
+    print(f"Snapshot {version} published")
+    return version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m scrape.daemon", description=__doc__.splitlines()[0])
+    parser.add_argument("--interval", type=int, default=15 * 60, help="segundos entre execuções")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--keep", type=int, default=5, help="versões mantidas em disco")
+    parser.add_argument("--once", action="store_true", help="executa uma vez e sai")
+    args = parser.parse_args(argv)
+
+    from scrape.snapshots import SnapshotStore
+
+    store = SnapshotStore(args.snapshot_dir, keep=args.keep)
+    scrapers = load_scrapers(["scot", "cepea", "b3"])
+
+    while True:
+        started = time.monotonic()
+        run_once(scrapers, store)
+        if args.once:
+            return
+        time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+
+
+if __name__ == "__main__":
+    main()
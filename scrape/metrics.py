@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("scrape.metrics")
+
+LAST_RUNS = {}
+_last_runs_lock = threading.Lock()
+
+
+class ScrapeMetrics:
+    """Métricas de uma execução: duração por etapa e url, bytes, status HTTP e linhas"""
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.started_at = time.time()
+        self.duration = None
+        self.stages = {}
+        self.requests = {}
+        self.rows = {}
+        self.changes = {}
+        self.stale = set()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, url=None, table=None):
+        """Mede a duração de uma etapa (fetch, parse, extract, transform, write...)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            key = (name, url or "", table or "")
+            with self._lock:
+                self.stages[key] = self.stages.get(key, 0.0) + elapsed
+
+    def record_request(self, url, status, size, duration, source):
+        """Registra o resultado de um download (source: network, cache, revalidated, error)"""
+        with self._lock:
+            self.requests[url] = {
+                "status": status,
+                "bytes": size,
+                "duration": duration,
+                "source": source,
+            }
+
+    def record_rows(self, table, count):
+        with self._lock:
+            self.rows[table] = count
+
+    def record_change(self, table, changed):
+        """Registra se o conteúdo da tabela mudou desde a execução anterior"""
+        with self._lock:
+            self.changes[table] = changed
+
+    def record_stale(self, frame):
+        """Registra um quadro servido a partir do último resultado bom"""
+        with self._lock:
+            self.stale.add(frame)
+
+    def finish(self):
+        """Fecha a execução, publica o resumo no log e guarda como última execução"""
+        self.duration = time.time() - self.started_at
+        logger.info(json.dumps(self.summary(), ensure_ascii=False))
+        with _last_runs_lock:
+            LAST_RUNS[self.scraper] = self
+
+    def summary(self):
+        with self._lock:
+            return {
+                "scraper": self.scraper,
+                "started_at": self.started_at,
+                "duration": self.duration,
+                "stages": [
+                    {"stage": name, "url": url, "table": table, "duration": duration}
+                    for (name, url, table), duration in self.stages.items()
+                ],
+                "requests": [dict(url=url, **data) for url, data in self.requests.items()],
+                "rows": dict(self.rows),
+                "changes": dict(self.changes),
+                "stale": sorted(self.stale),
+            }
+
+    def to_prometheus(self):
+        """Snapshot das métricas no formato texto do Prometheus"""
+        scraper = _escape(self.scraper)
+        lines = []
+        with self._lock:
+            if self.duration is not None:
+                lines.append(f'scrape_execute_duration_seconds{{scraper="{scraper}"}} {self.duration:.6f}')
+            lines.append(f'scrape_last_run_timestamp_seconds{{scraper="{scraper}"}} {self.started_at:.3f}')
+
+            for (name, url, table), duration in self.stages.items():
+                labels = f'scraper="{scraper}",stage="{_escape(name)}",url="{_escape(url)}",table="{_escape(table)}"'
+                lines.append(f"scrape_stage_duration_seconds{{{labels}}} {duration:.6f}")
+
+            for url, data in self.requests.items():
+                labels = f'scraper="{scraper}",url="{_escape(url)}",source="{data["source"]}"'
+                lines.append(f"scrape_http_request_duration_seconds{{{labels}}} {data['duration']:.6f}")
+                lines.append(f"scrape_http_response_bytes{{{labels}}} {data['bytes']}")
+                lines.append(f"scrape_http_status{{{labels}}} {data['status'] or 0}")
+
+            for table, count in self.rows.items():
+                lines.append(f'scrape_table_rows{{scraper="{scraper}",table="{_escape(table)}"}} {count}')
+
+            for table, changed in self.changes.items():
+                lines.append(f'scrape_table_changed{{scraper="{scraper}",table="{_escape(table)}"}} {int(changed)}')
+
+            for frame in sorted(self.stale):
+                lines.append(f'scrape_frame_stale{{scraper="{scraper}",frame="{_escape(frame)}"}} 1')
+
+        return "\n".join(lines) + "\n"
+
+
+METRIC_HELP = {
+    "scrape_execute_duration_seconds": "Duração total do execute()",
+    "scrape_last_run_timestamp_seconds": "Início da última execução (epoch)",
+    "scrape_stage_duration_seconds": "Duração acumulada por etapa, url e tabela",
+    "scrape_http_request_duration_seconds": "Duração do download por url",
+    "scrape_http_response_bytes": "Bytes do corpo recebido por url",
+    "scrape_http_status": "Status HTTP da última resposta por url",
+    "scrape_table_rows": "Linhas extraídas por tabela",
+    "scrape_table_changed": "1 se a tabela mudou desde a execução anterior",
+    "scrape_frame_stale": "1 se o quadro veio do último resultado bom (fonte lenta ou falhando)",
+}
+
+
+def prometheus_snapshot():
+    """Snapshot em texto Prometheus da última execução de cada scraper"""
+    with _last_runs_lock:
+        runs = list(LAST_RUNS.values())
+
+    samples = "".join(run.to_prometheus() for run in runs).splitlines()
+    lines = []
+    for metric, help_text in METRIC_HELP.items():
+        metric_samples = [line for line in samples if line.startswith(metric + "{")]
+        if not metric_samples:
+            continue
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        lines.extend(metric_samples)
+
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_snapshot(path):
+    """Grava o snapshot atomicamente, para ser lido pelo textfile collector do node_exporter"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        file.write(prometheus_snapshot())
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, path)
+    return path
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,195 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+# tracemalloc é global ao processo: o primeiro perfil a entrar liga e o último a sair desliga
+_tracing_lock = threading.Lock()
+_tracing_runs = 0
+
+# a partir do 3.12 o cProfile usa sys.monitoring: um único Profile ativo no processo, que
+# já vê todas as threads
+PROCESS_WIDE_PROFILER = sys.version_info >= (3, 12)
+
+
+class RunProfiler:
+    """Perfil de CPU e de alocação de uma execução, gravado em directory
+
+    Gera, com o mesmo prefixo <scraper>-<data>:
+    - .prof: estatísticas do cProfile (snakeviz, flameprof, pstats)
+    - .folded: pilhas amostradas no formato "a;b;c contagem" (flamegraph.pl, speedscope)
+    - .tracemalloc: snapshot das alocações (tracemalloc.Snapshot.load)
+    - .txt: resumo com as top funções por tempo e as top linhas por memória
+
+    As threads do pool entram no perfil quando a tarefa é envolvida com wrap(). Com
+    PROCESS_WIDE_PROFILER só a primeira de execuções simultâneas tem cProfile (que inclui
+    as threads das outras); as demais gravam só as pilhas amostradas e as alocações.
+    """
+
+    SAMPLE_INTERVAL = 0.005
+    TRACEMALLOC_FRAMES = 25
+
+    def __init__(self, directory, name, top=25):
+        self.directory = directory
+        self.name = name
+        self.top = top
+        self.path = None
+        self._profile = cProfile.Profile()
+        self._thread_profiles = []
+        self._threads = set()
+        self._stacks = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        try:
+            self._profile.enable()
+        except ValueError:  # outro profiler já ativo (no 3.12+, em qualquer thread)
+            self._profile = None
+
+        try:
+            _start_tracing(self.TRACEMALLOC_FRAMES)
+            try:
+                self._threads.add(threading.get_ident())
+                self._sampler = threading.Thread(target=self._sample, daemon=True)
+                self._sampler.start()
+            except BaseException:
+                _stop_tracing()
+                raise
+        except BaseException:
+            if self._profile is not None:
+                self._profile.disable()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._profile is not None:
+            self._profile.disable()
+        self.duration = time.perf_counter() - self.started
+        self._stop.set()
+        self._sampler.join()
+
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            # com outros perfis em andamento o pico é do processo, não só desta execução
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            _stop_tracing()
+
+        self.write(snapshot, peak)
+        return False
+
+    def wrap(self, function):
+        """Envolve uma tarefa que roda em outra thread para que ela entre no perfil"""
+
+        def profiled(*args, **kwargs):
+            ident = threading.get_ident()
+            with self._lock:
+                self._threads.add(ident)
+            try:
+                return self._run_profiled(function, args, kwargs)
+            finally:
+                with self._lock:
+                    self._threads.discard(ident)
+
+        return profiled
+
+    def _run_profiled(self, function, args, kwargs):
+        if PROCESS_WIDE_PROFILER:  # o Profile da execução já mede esta thread
+            return function(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # outro profiler já ativo nesta thread
+            return function(*args, **kwargs)
+
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self._lock:
+                self._thread_profiles.append(profile)
+
+    def write(self, snapshot, peak):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        self.path = os.path.join(self.directory, f"{self.name}-{stamp}")
+
+        profiles = [self._profile] if self._profile is not None else []
+        profiles += self._thread_profiles
+        stats = pstats.Stats(*profiles) if profiles else None
+        if stats is not None:
+            stats.dump_stats(f"{self.path}.prof")
+
+        with open(f"{self.path}.folded", "w", encoding="utf-8") as file:
+            for stack, count in sorted(self._stacks.items()):
+                file.write(f"{stack} {count}\n")
+
+        snapshot.dump(f"{self.path}.tracemalloc")
+
+        with open(f"{self.path}.txt", "w", encoding="utf-8") as file:
+            file.write(self.summary(stats, snapshot, peak))
+
+        print(f"Profile written to {self.path}.txt", file=sys.stderr)
+
+    def summary(self, stats, snapshot, peak):
+        out = io.StringIO()
+        out.write(f"{self.name}: {self.duration:.3f} s, pico de memória {peak / 1024 / 1024:.1f} MiB\n")
+        out.write(f"{sum(self._stacks.values())} amostras de pilha a cada {self.SAMPLE_INTERVAL * 1000:.0f} ms\n\n")
+
+        if stats is None:
+            out.write("cProfile indisponível: outro profiler estava ativo no processo\n\n")
+        else:
+            for sort in ("cumulative", "tottime"):
+                out.write(f"== Top {self.top} por {sort} ==\n")
+                stats.stream = out
+                stats.sort_stats(sort).print_stats(self.top)
+
+        out.write(f"== Top {self.top} alocações por linha ==\n")
+        for stat in snapshot.statistics("lineno")[: self.top]:
+            out.write(f"{stat}\n")
+        return out.getvalue()
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.SAMPLE_INTERVAL):
+            with self._lock:
+                threads = set(self._threads)
+            for ident, frame in sys._current_frames().items():
+                if ident == own or ident not in threads:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                self._stacks[key] = self._stacks.get(key, 0) + 1
+
+
+def _start_tracing(frames):
+    global _tracing_runs
+    with _tracing_lock:
+        if _tracing_runs == 0:
+            if tracemalloc.is_tracing():
+                _tracing_runs += 1  # ligado por fora: nunca desligar aqui
+            else:
+                tracemalloc.start(frames)
+            tracemalloc.reset_peak()
+        _tracing_runs += 1
+
+
+def _stop_tracing():
+    global _tracing_runs
+    with _tracing_lock:
+        _tracing_runs -= 1
+        if _tracing_runs == 0:
+            tracemalloc.stop()
@@ -0,0 +1,61 @@
+import threading
+from datetime import datetime
+
+
+class BackgroundRefresher:
+    """Guarda o último resultado de um loader e o recalcula em segundo plano após o TTL"""
+
+    def __init__(self, loader, ttl):
+        self.loader = loader
+        self.ttl = ttl
+        self._data = None
+        self._refreshed_at = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def get(self, wait=True, timeout=None):
+        """Retorna (dados, data da atualização); só bloqueia enquanto não há nenhum resultado
+
+        Com wait=False não bloqueia, mas espera até timeout segundos por uma atualização
+        em andamento antes de devolver o resultado anterior.
+        """
+        with self._lock:
+            if self._is_stale() and not self._refreshing:
+                self._refreshing = True
+                self._idle.clear()
+                threading.Thread(target=self._refresh, daemon=True).start()
+
+        if wait:
+            self._ready.wait()
+        elif timeout:
+            self._idle.wait(timeout)
+
+        with self._lock:
+            return self._data, self._refreshed_at
+
+    @property
+    def refreshing(self):
+        return self._refreshing
+
+    def _is_stale(self):
+        if self._refreshed_at is None:
+            return True
+        return (datetime.now() - self._refreshed_at).total_seconds() >= self.ttl
+
+    def _refresh(self):
+        try:
+            data = self.loader()
+        except Exception as error:
+            print(f"Fail to refresh data: {error}")
+        else:
+            with self._lock:
+                self._data = data
+                self._refreshed_at = datetime.now()
+        finally:
+            with self._lock:
+                self._refreshing = False
+            self._ready.set()
+            self._idle.set()
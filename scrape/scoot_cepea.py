@@ -1,10 +1,19 @@
 import re
 from datetime import datetime, timedelta
 from scrape.base import ScrapeBase
+from scrape.changes import digest_parts
+from scrape.selectors import TableSelector, selector_for
+from scrape.transforms import parse_ptbr_date, parse_ptbr_number
+import numpy as np
 import pandas as pd
 
 
 class ScootCepeaScrape(ScrapeBase):
+    SCOT_URL = "https://www.scotconsultoria.com.br/cotacoes/{link}/?ref=smn"
+    CEPEA_URL = "https://www.cepea.esalq.usp.br/br/indicador/boi-gordo.aspx"
+    CEPEA_TABLE_IDENTIFIERS = {"id": "imagenet-indicador1"}
+    CEPEA_INDICATOR = "CEPEA Boi Gordo"
+    RESUMO_CATEGORIES = {"Tipo": "category", "Cidade": "category", "Estado": "category"}
     STATES = [
         {
             "acronym": "AC",
@@ -143,51 +152,81 @@ class ScootCepeaScrape(ScrapeBase):
         },
     ]
 
-    def __init__(self):
+    SOURCES = ("scot", "cepea")
+
+    def __init__(self, sources=None):
         super().__init__()
-        self.df_states = pd.DataFrame(self.STATES)
+        self.sources = set(sources or self.SOURCES)
         self.data_frames = {}
+        self._selectors = None
+
+    @classmethod
+    def get_state_index(cls):
+        """Índice substring de sigla/nome -> estado, construído uma única vez a partir de STATES"""
+        if "_state_index" not in cls.__dict__:
+            index = {}
+            for state in cls.STATES:
+                for text in (state["acronym"], state["name"]):
+                    for start in range(len(text) + 1):
+                        for end in range(start, len(text) + 1):
+                            index.setdefault(text[start:end], state)
+            cls._state_index = index
+            cls._state_city_cache = {}
+        return cls._state_index
 
     def split_state_city(self, uf):
-        """Procura o estado pelo nome no DataFrame de estados"""
+        """Procura o estado pela sigla ou nome no índice de estados"""
+        index = self.get_state_index()
+        if uf in self._state_city_cache:
+            return self._state_city_cache[uf]
+
         original_uf = uf
         splited_data = self.split_strings(uf)
 
         if len(splited_data) == 2:
-            if len(splited_data[0]) == 2:
-                uf = splited_data[0]
-            else:
-                uf = splited_data[0]
+            uf = splited_data[0]
         elif len(splited_data) > 2:
             if re.search("-", original_uf):
                 uf = original_uf.split("-")[0].strip()
             else:
                 uf = " ".join(splited_data)
 
-        states = self.df_states[
-            self.df_states.apply(
-                lambda row: uf in row["acronym"] or uf in row["name"], axis=1
-            )
-        ]
+        state = index.get(uf)
 
-        if not states.empty:
-            state_acronym = states.iloc[0]["acronym"]
-            city = original_uf.replace(states.iloc[0]["acronym"], "").strip()
+        if state:
+            state_acronym = state["acronym"]
+            city = original_uf.replace(state["acronym"], "").strip()
         else:
             city, state_acronym = original_uf, ""
 
         if not city:
-            city = states.iloc[0]["capital"]
+            city = state["capital"]
+
+        result = city.upper(), state_acronym.upper()
+        self._state_city_cache[original_uf] = result
+        return result
 
-        return city.upper(), state_acronym.upper()
+    def resolve_state_city(self, ufs):
+        """Resolve Cidade/Estado de uma coluna UF, processando cada valor distinto uma única vez"""
+        resolved = {uf: self.split_state_city(uf) for uf in ufs.unique()}
+        return pd.DataFrame(
+            {
+                "Cidade": ufs.map({uf: value[0] for uf, value in resolved.items()}),
+                "Estado": ufs.map({uf: value[1] for uf, value in resolved.items()}),
+            },
+            index=ufs.index,
+        )
 
-    def extract_table_data(self, table_identifiers, headers):
+    def extract_table_data(self, soup, table_identifiers, headers):
         """Extrai dados de uma tabela específica do BeautifulSoup e retorna um DataFrame"""
-        table = self.soup.find("table", table_identifiers)
+        table = self.select_tables(None, soup, selector_for([table_identifiers])).get(0)
         if not table:
-            print(f"Table with {table_identifiers} not found.")
             return pd.DataFrame()
 
+        return self.table_to_frame(table, headers)
+
+    def table_to_frame(self, table, headers):
+        """Lê as linhas "conteudo" da tabela nas colunas informadas"""
         rows = []
         for tr in table.find_all("tr", {"class": "conteudo"}):
             cells = tr.find_all("td")
@@ -198,84 +237,238 @@ class ScootCepeaScrape(ScrapeBase):
 
         return pd.DataFrame(rows, columns=headers)
 
-    def customize_df(self, data):
-        def join_dataframe(data_dict):
-            for item in data_dict:
-                if not item.get("join"):
-                    continue
-                item["df"].insert(0, "Tipo", item.get("title"))
-
-            return pd.concat(
-                [i.get("df") for i in data_dict if i.get("join", False)],
-                ignore_index=True,
-            )
-
-        def pivoting_year(df, column_value):
-            current_year = datetime.now().year
-            last_year = datetime.now().year - 1
+    def cepea_table_to_frame(self, table):
+        """Primeira linha do indicador CEPEA (Data como UF, Valor)"""
+        first_row = table.find("tbody").find("tr")
+        date = first_row.find_all("td")[0].text.strip()
+        value = first_row.find_all("td")[1].text.strip()
+
+        return pd.DataFrame([[date, value]], columns=["UF", "Valor"])
+
+    def cepea_series(self, table):
+        """Tabela completa do indicador CEPEA como série diária (Data, Valor, Valor US$)"""
+        headers = [th.get_text(strip=True) for th in table.find_all("th")]
+        body = table.find("tbody") or table
+        cells = [
+            [td.get_text(strip=True) for td in tr.find_all("td")]
+            for tr in body.find_all("tr")
+        ]
+        return self.cepea_frame(headers, cells)
+
+    def cepea_frame(self, headers, cells):
+        """Converte linhas já lidas do indicador CEPEA em série (Data, Valor, Valor US$)
+
+        As células são convertidas por coluna, sem laço por linha.
+        """
+        width = len(headers) or max((len(row) for row in cells), default=0)
+        cells = [row for row in cells if len(row) == width]
+        if not cells or width < 2:
+            return pd.DataFrame(columns=["Data", "Valor", "Valor US$"])
+
+        columns = np.array(cells, dtype=object).T
+        series = pd.DataFrame({
+            "Data": parse_ptbr_date(pd.Series(columns[0])),
+            "Valor": parse_ptbr_number(pd.Series(columns[1])),
+        })
+        usd = [index for index, header in enumerate(headers) if "US$" in header]
+        if usd:
+            series["Valor US$"] = parse_ptbr_number(pd.Series(columns[usd[0]]))
+
+        return series.dropna(subset=["Data"]).sort_values("Data", ignore_index=True)
+
+    def clean_table(self, params, df):
+        """Remove as colunas descartadas e converte as colunas Valor para número"""
+        columns_remove = params.get("column_remove", [])
+        if columns_remove:
+            df = df.drop(columns=columns_remove)
+
+        values = {
+            column: parse_ptbr_number(df[column])
+            for column in df.columns
+            if column.startswith("Valor")
+        }
+        return df.assign(**values)
+
+    def normalize_table(self, params, df):
+        """Normaliza a tabela para o quadro final: linhas do Resumo ou quadro por ano"""
+        if df.empty:
+            return None
+
+        if params.get("join"):
+            location = self.resolve_state_city(df["UF"])
+            columns = {
+                "Tipo": params.get("title"),
+                "Cidade": location["Cidade"],
+                "Estado": location["Estado"],
+                "Valor": df["Valor"],
+            }
+            # Condicionais de validação da planilha
+            columns.update(params.get("override", {}))
+
+            df_result = pd.DataFrame(columns, index=df.index)
+            return df_result.astype(self.RESUMO_CATEGORIES)
+
+        return self.pivoting_year(df, params.get("pivot_column"))
+
+    def pivoting_year(self, df, column_value):
+        """Empilha Valor do ano corrente e do ano anterior em Ano / item / Valor
+
+        Monta cada coluna do resultado de uma vez, sem cópias intermediárias por ano.
+        """
+        current_year = datetime.now().year
+        last_year = current_year - 1
+
+        values = df[["Valor", f"Valor {last_year}"]].to_numpy(dtype="float64")
+        return pd.DataFrame(
+            {
+                "Ano": np.repeat(np.array([current_year, last_year], dtype="int16"), len(df)),
+                column_value: pd.Categorical(np.tile(df[column_value].to_numpy(), 2)),
+                "Valor": values.ravel(order="F"),
+            }
+        )
 
-            df_current_year = df[[column_value, "Valor"]].copy()
-            df_current_year['Ano'] = current_year
+    def process_table(self, url, table, params):
+        """Pipeline de uma tabela: extract -> clean -> normalize, assim que a página chega
 
-            df_last_year = df[[column_value, f"Valor {last_year}"]].copy()
-            df_last_year['Ano'] = last_year
-            df_last_year.rename(columns={f"Valor {last_year}": 'Valor'}, inplace=True)
+        table é a tabela já escolhida pelo seletor da página (None se não foi achada,
+        e então vale o último resultado bom). Se o HTML da tabela não mudou desde a
+        última execução, reaproveita o resultado anterior e não regrava o CSV do dia.
+        """
+        title = params.get("title")
+        if not table:
+            return self.stale_table(params)
 
-            df_result = pd.concat([df_current_year, df_last_year], ignore_index=True)
-            df_result = df_result[['Ano', column_value, 'Valor']]
+        digest = self.table_digest(table)
+        entry = self.lookup_unchanged(title, digest)
+        if entry:
+            df, normalized = entry["value"]
+        else:
+            with self.stage("extract", url=url, table=title):
+                if params.get("extractor") == "cepea":
+                    df = self.cepea_table_to_frame(table)
+                else:
+                    df = self.table_to_frame(table, params.get("headers"))
+
+            with self.stage("transform", url=url, table=title):
+                df = self.clean_table(params, df)
+                normalized = self.normalize_table(params, df)
+
+        self.metrics.record_rows(title, len(df))
+        file = self.save_unless_current(df, params.get("save_to"), entry)
+        self.remember_table(title, digest, (df, normalized), file, entry)
+
+        return {
+            "title": title,
+            "df": df,
+            "file": file,
+            "hash": digest,
+            "join": params.get("join", False),
+            "frame": params.get("frame"),
+            "normalized": normalized,
+        }
 
-            return df_result
+    def stale_table(self, params):
+        """Último resultado bom da tabela, marcado como desatualizado (ou None se não houver)"""
+        title = params.get("title")
+        entry = self.last_good(title)
+        if not entry:
+            return None
+
+        df, normalized = entry["value"]
+        return {
+            "title": title,
+            "df": df,
+            "file": None,
+            "hash": entry["hash"],
+            "join": params.get("join", False),
+            "frame": params.get("frame"),
+            "normalized": normalized,
+            "stale": True,
+        }
 
+    def customize_df(self, data):
+        """Monta os quadros finais (Resumo, Boi no mundo, Atacado) a partir das tabelas normalizadas"""
         yesterday = datetime.now() - timedelta(days=1)
         current_date = self.get_previous_weekday(yesterday)
-        year, month, _ = current_date.strftime("%Y-%m-%d").split("-")
-        date = current_date.strftime("%d/%m/%Y")
 
-        df_result = join_dataframe(data)
-        df_result[["Cidade", "Estado"]] = df_result["UF"].apply(
-            lambda x: pd.Series(self.split_state_city(x))
-        )
-        df_result = df_result.assign(Data=date, Ano=year, Mês=month)
-
-        df_result = df_result[["Tipo", "Cidade", "Estado", "Valor"]]
-
-        # Condicionais de validação da planilha
-        df_result.loc[
-            (df_result["Tipo"] == "BOI GORDO - CHINA"), ["Cidade", "Tipo"]
-        ] = ["CHINA", "BOI GORDO"]
-        df_result.loc[(df_result["Tipo"] == "CEPEA"), ["Tipo", "Cidade", "Estado"]] = [
-            "BOI GORDO",
-            "CHINA",
-            "CEPEA",
+        resumo_items = [
+            item
+            for item in data
+            if item.get("join") and item.get("normalized") is not None
         ]
+        digest = digest_parts([item.get("hash", "") for item in resumo_items])
+        resumo_key, resumo_file = self.resumo_output()
+        entry = self.lookup_unchanged(resumo_key, digest)
+        if entry:
+            df_result = entry["value"]
+        elif resumo_items:
+            df_result = pd.concat(
+                [item["normalized"] for item in resumo_items], ignore_index=True
+            ).astype(self.RESUMO_CATEGORIES)
+        else:
+            df_result = pd.DataFrame(
+                {
+                    "Tipo": pd.Categorical([]),
+                    "Cidade": pd.Categorical([]),
+                    "Estado": pd.Categorical([]),
+                    "Valor": pd.Series(dtype="float64"),
+                }
+            )
 
-        self.save_dataframe_to_csv(df_result, "resumo.csv")
-
-        df_boi_no_mundo = list(
-            filter(lambda x: x.get("title", "") == "BOI NO MUNDO", data)
-        )[0].get("df")
-        df_atacado = list(filter(lambda x: x.get("title", "") == "ATACADO", data))[
-            0
-        ].get("df")
+        file = self.save_unless_current(df_result, resumo_file, entry)
+        self.remember_table(resumo_key, digest, df_result, file, entry)
 
-        df_boi_no_mundo = pivoting_year(df=df_boi_no_mundo, column_value="Pais")
-        df_atacado = pivoting_year(df=df_atacado, column_value="Atacado SP")
+        self.data_frames = {'Resumo': df_result}
+        if any(item.get("stale") for item in resumo_items):
+            self.metrics.record_stale("Resumo")
+        for item in data:
+            if item.get("frame") and item.get("normalized") is not None:
+                self.data_frames[item["frame"]] = item["normalized"]
+                if item.get("stale"):
+                    self.metrics.record_stale(item["frame"])
 
-        self.data_frames = {
-            'Resumo': df_result,
-            'Boi no mundo': df_boi_no_mundo,
-            'Atacado': df_atacado,
-        }
+        self.save_to_history(current_date.date())
 
         return self.data_frames
 
-
-    def execute(self):
-        """Raspa cotações das páginas especificadas e envia por email"""
-        extracts = [
+    def resumo_output(self):
+        """(chave no rastreador, arquivo do dia) do Resumo
+
+        Só a execução com todas as fontes grava o resumo.csv; as parciais gravam um
+        arquivo com o nome das fontes (resumo-cepea.csv) e não substituem o Resumo completo.
+        """
+        if self.sources >= set(self.SOURCES):
+            return "Resumo", "resumo.csv"
+        selected = "-".join(sorted(self.sources))
+        return f"Resumo:{selected}", f"resumo-{selected}.csv"
+
+    def save_to_history(self, date):
+        """Acrescenta os quadros calculados ao histórico local"""
+        store = self.get_history_store()
+        if not store:
+            return
+
+        # quadros desatualizados já estão no histórico com a data em que foram coletados
+        if "Resumo" not in self.metrics.stale:
+            store.upsert_quotes(date, self.data_frames["Resumo"])
+        for params in self.get_table_params():
+            frame = params.get("frame")
+            if frame in self.data_frames and frame not in self.metrics.stale:
+                store.upsert_yearly(
+                    date, frame, self.data_frames[frame], params.get("pivot_column")
+                )
+
+    def get_extracts(self):
+        """Pipeline declarativo: páginas e, para cada uma, as tabelas e como tratá-las
+
+        Tabelas com join entram no Resumo (override ajusta colunas fixas); as demais
+        viram um quadro próprio (frame) empilhado por ano a partir de pivot_column.
+        """
+        last_year = datetime.now().year - 1
+        return [
             {
-                "link": "boi-gordo",
-                "join": True,
+                "source": "scot",
+                "url": self.SCOT_URL.format(link="boi-gordo"),
                 "params": [
                     {
                         "title": "BOI GORDO - CHINA",
@@ -286,6 +479,8 @@ class ScootCepeaScrape(ScrapeBase):
                         },
                         "headers": ["UF", "Valor"],
                         "save_to": "boi_china_prazo.csv",
+                        "join": True,
+                        "override": {"Cidade": "CHINA", "Tipo": "BOI GORDO"},
                     },
                     {
                         "title": "BOI GORDO",
@@ -297,12 +492,13 @@ class ScootCepeaScrape(ScrapeBase):
                         },
                         "headers": ["UF", "Valor"],
                         "save_to": "boi_mercado_fisico.csv",
+                        "join": True,
                     },
                 ],
             },
             {
-                "link": "vaca-gorda",
-                "join": True,
+                "source": "scot",
+                "url": self.SCOT_URL.format(link="vaca-gorda"),
                 "params": [
                     {
                         "title": "VACA GORDA",
@@ -313,12 +509,13 @@ class ScootCepeaScrape(ScrapeBase):
                         },
                         "headers": ["UF", "Valor"],
                         "save_to": "vaca_mercado_fisico.csv",
+                        "join": True,
                     }
                 ],
             },
             {
-                "link": "novilha",
-                "join": True,
+                "source": "scot",
+                "url": self.SCOT_URL.format(link="novilha"),
                 "params": [
                     {
                         "title": "NOVILHA",
@@ -331,12 +528,13 @@ class ScootCepeaScrape(ScrapeBase):
                         },
                         "headers": ["UF", "Valor"],
                         "save_to": "novilha_mercado_fisico.csv",
+                        "join": True,
                     }
                 ],
             },
             {
-                "link": "boi-no-mundo",
-                "join": False,
+                "source": "scot",
+                "url": self.SCOT_URL.format(link="boi-no-mundo"),
                 "params": [
                     {
                         "title": "BOI NO MUNDO",
@@ -346,14 +544,16 @@ class ScootCepeaScrape(ScrapeBase):
                             "cellspacing": "0",
                             "width": "660",
                         },
-                        "headers": ["Pais", "Valor", f"Valor {datetime.now().year -1}"],
+                        "headers": ["Pais", "Valor", f"Valor {last_year}"],
                         "save_to": "boi_no_mundo.csv",
+                        "frame": "Boi no mundo",
+                        "pivot_column": "Pais",
                     }
                 ],
             },
             {
-                "link": "atacado",
-                "join": False,
+                "source": "scot",
+                "url": self.SCOT_URL.format(link="atacado"),
                 "params": [
                     {
                         "title": "ATACADO",
@@ -367,65 +567,95 @@ class ScootCepeaScrape(ScrapeBase):
                             "Atacado SP",
                             "Valor",
                             "Img",
-                            f"Valor {datetime.now().year -1}",
+                            f"Valor {last_year}",
                         ],
                         "save_to": "atacado.csv",
                         "column_remove": ["Img"],
+                        "frame": "Atacado",
+                        "pivot_column": "Atacado SP",
+                    }
+                ],
+            },
+            {
+                "source": "cepea",
+                "url": self.CEPEA_URL,
+                "params": [
+                    {
+                        "title": "CEPEA",
+                        "extractor": "cepea",
+                        "table_identifiers": self.CEPEA_TABLE_IDENTIFIERS,
+                        "save_to": "cpea.csv",
+                        "join": True,
+                        "override": {
+                            "Tipo": "BOI GORDO",
+                            "Cidade": "CHINA",
+                            "Estado": "CEPEA",
+                        },
                     }
                 ],
             },
         ]
 
-        scrapes = []
-        # Scot Consultoria
-        for extract in extracts:
-            url = f"https://www.scotconsultoria.com.br/cotacoes/{extract['link']}/?ref=smn"
-            self.fetch_page_content(url)
-
-            if self.soup:
-                for params in extract["params"]:
-                    table_identifiers = params.get("table_identifiers")
-                    headers = params.get("headers")
-                    save_to = params.get("save_to")
-                    df = self.extract_table_data(table_identifiers, headers)
-                    columns_remove = params.get("column_remove", [])
-                    if len(columns_remove) > 0:
-                        for col in columns_remove:
-                            df = df.drop(columns=[col])
-
-                    file = self.save_dataframe_to_csv(df, save_to)
-                    scrapes.append(
-                        {
-                            "title": params.get("title"),
-                            "df": df,
-                            "file": file,
-                            "join": extract.get("join", False),
-                        }
-                    )
-
-            else:
-                print(f"Page not found {url}")
-
-        # CEPEA
-        url = "https://www.cepea.esalq.usp.br/br/indicador/boi-gordo.aspx"
-        self.fetch_page_content(url)
+    def get_table_params(self):
+        """Todas as tabelas do pipeline, na ordem declarada"""
+        return [params for extract in self.get_extracts() for params in extract["params"]]
 
-        if self.soup:
-            table = self.soup.find("table", {"id": "imagenet-indicador1"})
-            if table:
-                first_row = table.find("tbody").find("tr")
-                date = first_row.find_all("td")[0].text.strip()
-                value = first_row.find_all("td")[1].text.strip()
-
-                df = pd.DataFrame([[date, value]], columns=["UF", "Valor"])
-                file = self.save_dataframe_to_csv(df, "cpea.csv")
-                scrapes.append({"title": "CEPEA", "df": df, "file": file, "join": True})
-            else:
-                print("Table not found")
-
-        return self.customize_df(scrapes)
+    def execution_key(self):
+        """Execuções com as mesmas fontes compartilham o resultado"""
+        return f"{type(self).__name__}:{','.join(sorted(self.sources))}"
 
+    def get_page_table_identifiers(self):
+        """Identificadores das tabelas usadas em cada página (url -> lista de identificadores)"""
+        return {
+            extract["url"]: [params["table_identifiers"] for params in extract["params"]]
+            for extract in self.get_extracts()
+        }
 
+    def get_page_selectors(self):
+        """Seletor compilado de cada página (url -> TableSelector por título da tabela)"""
+        if self._selectors is None:
+            self._selectors = {
+                extract["url"]: TableSelector(
+                    {params["title"]: params["table_identifiers"] for params in extract["params"]}
+                )
+                for extract in self.get_extracts()
+            }
+        return self._selectors
 
+    def execute(self):
+        """Raspa cotações das páginas especificadas e envia por email"""
+        extracts = [
+            extract
+            for extract in self.get_extracts()
+            if extract["source"] in self.sources
+        ]
+        urls = [extract["url"] for extract in extracts]
+        selectors = self.get_page_selectors()
+        processed = {}
+
+        # Cada página segue pelo pipeline assim que chega, sem esperar as demais
+        for url, soup in self.iter_pages(
+            urls, parse_only=self.get_page_table_identifiers()
+        ):
+            extract = extracts[urls.index(url)]
+            if not soup:
+                print(f"Page not found {url}")
+                processed[url] = [self.stale_table(params) for params in extract["params"]]
+                continue
 
+            tables = self.select_tables(url, soup, selectors[url])
+            processed[url] = [
+                self.process_table(url, tables.get(params["title"]), params)
+                for params in extract["params"]
+            ]
+            del soup
+
+        scrapes = [
+            item
+            for url in urls
+            for item in processed.get(url, [])
+            if item is not None
+        ]
 
+        with self.stage("transform"):
+            return self.customize_df(scrapes)
@@ -0,0 +1,97 @@
+import functools
+
+
+class TableSelection:
+    """Resultado de TableSelector.select: tabela escolhida por nome e o que não bateu"""
+
+    def __init__(self, tables, missing, ambiguous, overlapping):
+        self.tables = tables
+        self.missing = missing
+        self.ambiguous = ambiguous
+        self.overlapping = overlapping
+
+    def get(self, name):
+        return self.tables.get(name)
+
+    def problems(self):
+        """Mensagens para nomes sem tabela, com várias tabelas ou que dividem a mesma tabela"""
+        messages = [f"Table {name} not found" for name in self.missing]
+        messages += [
+            f"Table {name} matched {count} tables, using the first"
+            for name, count in self.ambiguous.items()
+        ]
+        messages += [
+            f"Tables {', '.join(map(str, names))} match the same table"
+            for names in self.overlapping
+        ]
+        return messages
+
+
+class TableSelector:
+    """Identificadores de tabela compilados uma vez; acha todas as tabelas pedidas em uma
+    única passada pelo documento
+
+    Segue o critério do BeautifulSoup.find("table", identificadores): para cada nome vale
+    a primeira tabela do documento que casa, e class casa com qualquer uma das classes.
+    """
+
+    def __init__(self, identifiers):
+        """identifiers: {nome: {atributo: valor}}"""
+        self.identifiers = dict(identifiers)
+        self._conditions = [
+            (name, tuple((key, value, key == "class") for key, value in attrs.items()))
+            for name, attrs in self.identifiers.items()
+        ]
+
+    @property
+    def names(self):
+        return list(self.identifiers)
+
+    def match(self, attrs):
+        """Nomes cujos identificadores casam com os atributos de uma tabela"""
+        return [
+            name
+            for name, conditions in self._conditions
+            if all(_matches(attrs.get(key), value, multi) for key, value, multi in conditions)
+        ]
+
+    def select(self, soup):
+        """Percorre as tabelas do documento uma vez e escolhe a tabela de cada nome"""
+        tables = {}
+        counts = {}
+        overlapping = []
+        for table in soup.find_all("table"):
+            names = self.match(table.attrs)
+            if len(names) > 1:
+                overlapping.append(names)
+            for name in names:
+                counts[name] = counts.get(name, 0) + 1
+                tables.setdefault(name, table)
+
+        return TableSelection(
+            tables,
+            missing=[name for name in self.identifiers if name not in tables],
+            ambiguous={name: count for name, count in counts.items() if count > 1},
+            overlapping=overlapping,
+        )
+
+
+def selector_for(table_identifiers):
+    """TableSelector compilado (e reaproveitado) para uma lista de identificadores,
+    com os índices da lista como nomes"""
+    return _compiled(tuple(tuple(identifiers.items()) for identifiers in table_identifiers))
+
+
+@functools.lru_cache(maxsize=256)
+def _compiled(frozen):
+    return TableSelector({index: dict(items) for index, items in enumerate(frozen)})
+
+
+def _matches(actual, expected, multi):
+    if actual is None:
+        return False
+    if isinstance(actual, (list, tuple)):
+        return expected in actual or " ".join(actual) == expected
+    if multi:
+        return expected in actual.split() or actual == expected
+    return actual == expected
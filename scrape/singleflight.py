@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+
+class SingleFlight:
+    """Junta chamadas simultâneas com a mesma chave: só a primeira executa, as demais
+    esperam e recebem o mesmo resultado (ou a mesma exceção)"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = function()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+@contextmanager
+def file_lease(path, timeout=None):
+    """Lock exclusivo em arquivo, compartilhado entre processos
+
+    Espera até timeout segundos (None: sem limite); entrega True se o lock foi obtido e
+    False se o prazo acabou ou a plataforma não tem flock, e nesse caso o chamador
+    segue sem exclusividade.
+    """
+    if fcntl is None:
+        yield False
+        return
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path, "a+") as handle:
+        acquired = _acquire(handle, timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _acquire(handle, timeout):
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
@@ -0,0 +1,111 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime
+
+import pyarrow as pa
+
+
+class SnapshotStore:
+    """Snapshots versionados dos quadros em Arrow IPC, lidos por memory-map"""
+
+    LATEST_FILE = "LATEST"
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, directory, keep=5):
+        self.directory = directory
+        self.keep = keep
+
+    def publish(self, results, stale=None):
+        """Grava {fonte: {título: DataFrame}} como uma nova versão e a torna a mais recente
+
+        stale ({fonte: títulos}) marca no manifest os quadros servidos do último resultado bom.
+        """
+        stale = stale or {}
+        os.makedirs(self.directory, exist_ok=True)
+        created_at = datetime.now()
+        version = created_at.strftime("%Y%m%dT%H%M%S%f")
+        temp_dir = tempfile.mkdtemp(dir=self.directory, prefix=".tmp-")
+
+        manifest = {"version": version, "created_at": created_at.isoformat(), "frames": []}
+        for source, frames in results.items():
+            for title, df in frames.items():
+                file_name = f"{_slug(source)}-{_slug(title)}.arrow"
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                with pa.OSFile(os.path.join(temp_dir, file_name), "wb") as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                manifest["frames"].append({
+                    "source": source,
+                    "title": title,
+                    "file": file_name,
+                    "stale": title in stale.get(source, ()),
+                })
+
+        with open(os.path.join(temp_dir, self.MANIFEST_FILE), "w", encoding="utf-8") as file:
+            json.dump(manifest, file, ensure_ascii=False, indent=2)
+
+        os.chmod(temp_dir, 0o755)
+        os.replace(temp_dir, os.path.join(self.directory, version))
+        self._write_latest(version)
+        self.prune()
+        return version
+
+    def latest_version(self):
+        try:
+            with open(os.path.join(self.directory, self.LATEST_FILE), encoding="utf-8") as file:
+                version = file.read().strip()
+        except OSError:
+            return None
+
+        return version if os.path.isdir(os.path.join(self.directory, version)) else None
+
+    def load(self, version=None, as_pandas=True, sources=None):
+        """Lê uma versão (a mais recente por padrão) via memory-map
+
+        Retorna ({fonte: {título: quadro}}, manifest). Com as_pandas=False os quadros
+        são pyarrow.Table apontando direto para o arquivo mapeado, sem cópia. sources
+        limita a leitura aos quadros dessas fontes.
+        """
+        version = version or self.latest_version()
+        if not version:
+            return None, None
+
+        version_dir = os.path.join(self.directory, version)
+        with open(os.path.join(version_dir, self.MANIFEST_FILE), encoding="utf-8") as file:
+            manifest = json.load(file)
+
+        results = {}
+        for frame in manifest["frames"]:
+            if sources is not None and frame["source"] not in sources:
+                continue
+            source = pa.memory_map(os.path.join(version_dir, frame["file"]), "r")
+            table = pa.ipc.open_file(source).read_all()
+            results.setdefault(frame["source"], {})[frame["title"]] = (
+                table.to_pandas() if as_pandas else table
+            )
+
+        return results, manifest
+
+    def prune(self):
+        """Remove as versões mais antigas, mantendo as keep mais recentes"""
+        versions = sorted(
+            name
+            for name in os.listdir(self.directory)
+            if not name.startswith(".") and os.path.isdir(os.path.join(self.directory, name))
+        )
+        for version in versions[: -self.keep]:
+            shutil.rmtree(os.path.join(self.directory, version), ignore_errors=True)
+
+    def _write_latest(self, version):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(version)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, os.path.join(self.directory, self.LATEST_FILE))
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
@@ -0,0 +1,194 @@
+import os
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+from scrape.transforms import parse_ptbr_number
+
+
+class HistoryStore:
+    """Histórico local das cotações em SQLite, com upserts idempotentes e consultas por período"""
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS quotes (
+            date TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            cidade TEXT NOT NULL,
+            estado TEXT NOT NULL,
+            valor REAL,
+            PRIMARY KEY (date, tipo, cidade, estado)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS quotes_series
+            ON quotes (tipo, cidade, estado, date)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS yearly (
+            date TEXT NOT NULL,
+            tabela TEXT NOT NULL,
+            item TEXT NOT NULL,
+            ano INTEGER NOT NULL,
+            valor REAL,
+            PRIMARY KEY (tabela, item, ano, date)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS series (
+            series TEXT NOT NULL,
+            mes TEXT NOT NULL,
+            date TEXT NOT NULL,
+            valor REAL,
+            PRIMARY KEY (series, mes, date)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS series_by_date
+            ON series (series, date)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS indicators (
+            indicador TEXT NOT NULL,
+            date TEXT NOT NULL,
+            valor REAL,
+            valor_usd REAL,
+            PRIMARY KEY (indicador, date)
+        ) WITHOUT ROWID
+        """,
+    ]
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with closing(self.connect()) as connection, connection:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def upsert_quotes(self, date, df):
+        """Grava o Resumo (Tipo, Cidade, Estado, Valor) da data informada"""
+        rows = zip(
+            [str(date)] * len(df),
+            df["Tipo"].astype(str),
+            df["Cidade"].astype(str),
+            df["Estado"].astype(str),
+            self._to_number(df["Valor"]),
+        )
+        self._upsert(
+            """
+            INSERT INTO quotes (date, tipo, cidade, estado, valor) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (date, tipo, cidade, estado) DO UPDATE SET valor = excluded.valor
+            """,
+            rows,
+        )
+
+    def upsert_yearly(self, date, table, df, column_value):
+        """Grava uma tabela Ano/item/Valor (Boi no mundo, Atacado) da data informada"""
+        rows = zip(
+            [str(date)] * len(df),
+            [table] * len(df),
+            df[column_value].astype(str),
+            df["Ano"].astype(int),
+            self._to_number(df["Valor"]),
+        )
+        self._upsert(
+            """
+            INSERT INTO yearly (date, tabela, item, ano, valor) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (tabela, item, ano, date) DO UPDATE SET valor = excluded.valor
+            """,
+            rows,
+        )
+
+    def upsert_series(self, date, series, df):
+        """Grava a curva Mês/Valor de uma série (Boi Gordo, Dolar) coletada na data informada"""
+        rows = zip(
+            [series] * len(df),
+            df["Mês"].astype(str),
+            [str(date)] * len(df),
+            self._to_number(df["Valor"]),
+        )
+        self._upsert(
+            """
+            INSERT INTO series (series, mes, date, valor) VALUES (?, ?, ?, ?)
+            ON CONFLICT (series, mes, date) DO UPDATE SET valor = excluded.valor
+            """,
+            rows,
+        )
+
+    def upsert_indicator(self, indicator, df):
+        """Grava a série diária de um indicador (Data, Valor e opcionalmente Valor US$)"""
+        usd = df["Valor US$"] if "Valor US$" in df else pd.Series([None] * len(df), dtype="float64")
+        rows = zip(
+            [indicator] * len(df),
+            pd.to_datetime(df["Data"]).dt.strftime("%Y-%m-%d"),
+            self._to_number(df["Valor"]),
+            self._to_number(usd),
+        )
+        self._upsert(
+            """
+            INSERT INTO indicators (indicador, date, valor, valor_usd) VALUES (?, ?, ?, ?)
+            ON CONFLICT (indicador, date) DO UPDATE
+                SET valor = excluded.valor, valor_usd = excluded.valor_usd
+            """,
+            rows,
+        )
+
+    def query_quotes(self, tipo, cidade=None, estado=None, start=None, end=None):
+        """Histórico de um Tipo (opcionalmente Cidade/Estado) entre start e end"""
+        filters, params = ["tipo = ?"], [tipo]
+        if cidade is not None:
+            filters.append("cidade = ?")
+            params.append(cidade)
+        if estado is not None:
+            filters.append("estado = ?")
+            params.append(estado)
+        return self._query("quotes", filters, params, start, end)
+
+    def query_yearly(self, table, item=None, start=None, end=None):
+        """Histórico de uma tabela anual (Boi no mundo, Atacado) entre start e end"""
+        filters, params = ["tabela = ?"], [table]
+        if item is not None:
+            filters.append("item = ?")
+            params.append(item)
+        return self._query("yearly", filters, params, start, end)
+
+    def query_series(self, series, mes=None, start=None, end=None):
+        """Histórico de uma série B3 (opcionalmente de um vencimento) entre start e end"""
+        filters, params = ["series = ?"], [series]
+        if mes is not None:
+            filters.append("mes = ?")
+            params.append(str(mes))
+        return self._query("series", filters, params, start, end)
+
+    def query_indicator(self, indicator, start=None, end=None):
+        """Série diária de um indicador (ex.: CEPEA Boi Gordo) entre start e end"""
+        return self._query("indicators", ["indicador = ?"], [indicator], start, end)
+
+    def _query(self, table, filters, params, start, end):
+        if start is not None:
+            filters.append("date >= ?")
+            params.append(str(start))
+        if end is not None:
+            filters.append("date <= ?")
+            params.append(str(end))
+
+        sql = f"SELECT * FROM {table} WHERE {' AND '.join(filters)} ORDER BY date"
+        with closing(self.connect()) as connection:
+            return pd.read_sql_query(sql, connection, params=params)
+
+    def _upsert(self, sql, rows):
+        with closing(self.connect()) as connection, connection:
+            connection.executemany(sql, rows)
+
+    @staticmethod
+    def _to_number(values):
+        if pd.api.types.is_numeric_dtype(values):
+            return values.astype(float).tolist()
+        return parse_ptbr_number(values).tolist()
@@ -0,0 +1,97 @@
+from collections import namedtuple
+
+from bs4.dammit import EncodingDetector
+from lxml import etree
+
+from scrape.selectors import TableSelector, selector_for
+
+DEFAULT_ENCODING = "utf-8"
+
+# table: nome (ou índice) do identificador que casou; attrs: atributos do <tr>;
+# cells: textos das células; header: linha só de <th>
+StreamRow = namedtuple("StreamRow", ["table", "attrs", "cells", "header"])
+
+
+def iter_table_rows(chunks, table_identifiers):
+    """Lê as linhas das tabelas que casam com table_identifiers, bloco a bloco
+
+    table_identifiers é um TableSelector ou uma lista de identificadores (compilada uma
+    vez por selector_for, com os índices como nomes).
+
+    O HTML é alimentado aos poucos em um parser incremental do lxml; cada <tr> é
+    entregue assim que fecha e os elementos já consumidos são descartados da árvore,
+    então a memória não cresce com o tamanho do documento.
+    """
+    selector = table_identifiers if isinstance(table_identifiers, TableSelector) else selector_for(table_identifiers)
+    parser = None
+    tables = []
+    for chunk in chunks:
+        if parser is None:
+            parser = etree.HTMLPullParser(
+                events=("start", "end"), encoding=_declared_encoding(chunk)
+            )
+        parser.feed(chunk)
+        yield from _read_rows(parser, tables, selector)
+
+    if parser is None:
+        return
+    parser.close()
+    yield from _read_rows(parser, tables, selector)
+
+
+def chunked(rows, size):
+    """Agrupa um iterável de linhas em listas de até size itens"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _read_rows(parser, tables, selector):
+    for event, element in parser.read_events():
+        tag = element.tag
+        if not isinstance(tag, str):
+            continue
+
+        if event == "start":
+            if tag == "table":
+                names = selector.match(element.attrib)
+                tables.append(names[0] if names else None)
+            continue
+
+        matched = next((index for index in reversed(tables) if index is not None), None)
+        if tag == "tr" and matched is not None:
+            cells = [_text(cell) for cell in element.iter("td")]
+            header = not cells
+            if header:
+                cells = [_text(cell) for cell in element.iter("th")]
+            yield StreamRow(matched, dict(element.attrib), cells, header)
+
+        if tag == "table" and tables:
+            tables.pop()
+
+        if matched is None or tag in ("tr", "table"):
+            _release(element)
+
+
+def _declared_encoding(chunk):
+    """Encoding declarado no início do documento (BOM ou <meta charset>), senão UTF-8"""
+    encoding = EncodingDetector.find_declared_encoding(chunk, is_html=True)
+    return encoding or DEFAULT_ENCODING
+
+
+def _text(cell):
+    return "".join(cell.itertext()).strip()
+
+
+def _release(element):
+    """Libera o elemento já consumido e os irmãos anteriores"""
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
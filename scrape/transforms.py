@@ -0,0 +1,73 @@
+import pandas as pd
+
+MONTHS_PT = {
+    "janeiro": 1,
+    "fevereiro": 2,
+    "março": 3,
+    "abril": 4,
+    "maio": 5,
+    "junho": 6,
+    "julho": 7,
+    "agosto": 8,
+    "setembro": 9,
+    "outubro": 10,
+    "novembro": 11,
+    "dezembro": 12,
+}
+MONTHS_PT.update({name[:3]: number for name, number in list(MONTHS_PT.items())})
+
+MONTH_YEAR_EXPRESSION = r"^\s*([^\W\d_]+)\s*/\s*(\d{2}|\d{4})\s*$"
+PTBR_DECIMAL_TRANSLATION = str.maketrans(",.", ".,")
+
+
+def parse_ptbr_number(values):
+    """Converte uma Series de números no formato brasileiro (1.234,56) para float"""
+    text = values.astype("string").str.strip()
+    text = text.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    return pd.to_numeric(text, errors="coerce").astype("float64")
+
+
+def parse_ptbr_date(values):
+    """Converte uma Series de datas no formato brasileiro (dd/mm/aaaa) para datetime"""
+    return pd.to_datetime(values.astype("string").str.strip(), format="%d/%m/%Y", errors="coerce")
+
+
+def format_ptbr_number(values, decimals=4):
+    """Formata uma Series numérica no padrão brasileiro (1.234,5600); vazios ficam vazios"""
+    formatted = values.map(f"{{:,.{decimals}f}}".format, na_action="ignore")
+    return formatted.astype("string").str.translate(PTBR_DECIMAL_TRANSLATION)
+
+
+def format_ptbr_frame(df, decimals=2):
+    """Cópia do quadro pronta para exibição: números no padrão brasileiro e datas AAAA-MM-DD
+
+    Os quadros circulam tipados (float, category, datetime); a formatação só acontece
+    na hora de exibir ou gravar o CSV.
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_float_dtype(values):
+            columns[column] = format_ptbr_number(values, decimals)
+        elif pd.api.types.is_datetime64_any_dtype(values):
+            columns[column] = values.dt.strftime("%Y-%m-%d")
+    return df.assign(**columns) if columns else df
+
+
+def parse_ptbr_month_year(values, anchor="start"):
+    """Converte "Mês/Ano" em português (ex.: Outubro/2024, Out/24) para datas
+
+    anchor="start" devolve o primeiro dia do mês e anchor="end" o último.
+    Anos com dois dígitos são interpretados como 20AA.
+    """
+    parts = values.astype("string").str.extract(MONTH_YEAR_EXPRESSION)
+    months = parts[0].str.lower().map(MONTHS_PT).astype("float64")
+    years = pd.to_numeric(parts[1], errors="coerce").astype("float64")
+    years = years.where(years >= 100, years + 2000)
+
+    dates = pd.to_datetime(
+        pd.DataFrame({"year": years, "month": months, "day": 1}), errors="coerce"
+    )
+    if anchor == "end":
+        dates = dates + pd.offsets.MonthEnd(0)
+    return dates
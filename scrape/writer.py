@@ -0,0 +1,90 @@
+import os
+import queue
+import tempfile
+import threading
+from concurrent.futures import Future
+
+from scrape.transforms import format_ptbr_frame
+
+
+class OutputWriter:
+    """Grava DataFrames em segundo plano: fila limitada, lotes e escrita atômica (temp + rename)
+
+    Os DataFrames entregues não devem ser alterados depois do submit. Com decimals, os
+    números são gravados no padrão brasileiro (formatação feita na thread do writer).
+    """
+
+    def __init__(self, max_queue=64, batch_size=16, compression=None):
+        self.batch_size = batch_size
+        self.compression = compression
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, df, path, metrics=None, decimals=None):
+        """Enfileira a escrita e retorna um Future com o caminho final do arquivo
+
+        Só bloqueia quando a fila está cheia, limitando a memória retida.
+        """
+        if self.compression == "gzip":
+            path = f"{path}.gz"
+
+        future = Future()
+        self._ensure_started()
+        self._queue.put((df, path, metrics, decimals, future))
+        return future
+
+    def flush(self):
+        """Aguarda todas as escritas enfileiradas"""
+        if self._thread:
+            self._queue.join()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for df, path, metrics, decimals, future in batch:
+                try:
+                    if decimals is not None:
+                        df = format_ptbr_frame(df, decimals)
+                    if metrics:
+                        with metrics.stage("write", table=os.path.basename(path)):
+                            self._write(df, path)
+                    else:
+                        self._write(df, path)
+                except Exception as error:
+                    print(f"Fail to write {path}: {error}")
+                    future.set_exception(error)
+                else:
+                    future.set_result(path)
+                finally:
+                    self._queue.task_done()
+
+    def _write(self, df, path):
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        os.close(fd)
+        os.chmod(temp_path, 0o644)
+        try:
+            df.to_csv(
+                temp_path,
+                index=False,
+                compression={"method": self.compression} if self.compression else None,
+            )
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise